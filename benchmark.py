@@ -0,0 +1,666 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the fetch, export and analysis pipeline
+Runs on synthetic data against a local fake Graph API, no Facebook credentials needed
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+
+def make_posts(num_posts, comments_per_post):
+    """Build synthetic posts with nested comments in the export layout"""
+    posts = []
+    for p in range(num_posts):
+        comments = []
+        for c in range(comments_per_post):
+            comments.append({
+                'id': f'comment_{p}_{c}',
+                'message': f'Synthetic comment {c} on post {p} with a bit of text to scan',
+                'created_time': f'2025-12-{1 + c % 28:02d}T{c % 24:02d}:00:00+0000',
+                'author': f'Commenter {c % 5000}',
+                'author_id': f'user_{c % 5000}',
+                'like_count': c % 17,
+                'type': 'comment',
+            })
+        posts.append({
+            'id': f'post_{p}',
+            'message': f'Synthetic post number {p}',
+            'created_time': '2025-12-01T00:00:00+0000',
+            'type': 'status',
+            'comments': comments,
+        })
+    return posts
+
+
+def timed(func, *args, **kwargs):
+    """Run func once and return (result, seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def traced(func, *args, **kwargs):
+    """Run func once and return (result, seconds, peak traced MB)"""
+    import gc
+    import tracemalloc
+    
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result, seconds = timed(func, *args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+
+def write_export(path, posts):
+    """Write posts as a facebook_data_*.json export"""
+    data = {
+        'metadata': {
+            'exported_at': '2025-12-01T00:00:00',
+            'total_posts': len(posts),
+            'total_comments': sum(len(post['comments']) for post in posts),
+            'platform': 'facebook',
+        },
+        'user': {'id': 'bench_user', 'name': 'Bench User'},
+        'posts': posts,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+class FakeGraphAPI:
+    """
+    Local stand-in for the Graph API endpoints the fetcher uses
+    
+    Serves GET /me, /me/posts and /{post_id}/comments (with or without a
+    /vXX.X version prefix) from synthetic data, paginated with 'after'
+    cursors and paging.next links like the real API. Every response can be
+    delayed by a fixed latency, and every Nth request can be rejected with
+    the Graph API rate-limit error (code 4) to exercise throttling.
+    """
+    
+    def __init__(self, num_posts=100, comments_per_post=50, page_size=25,
+                 latency=0.0, throttle_every=0):
+        self.posts = make_posts(num_posts, comments_per_post)
+        self.comments = {post['id']: post.pop('comments') for post in self.posts}
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    def start(self):
+        """Start serving on a free local port in a background thread"""
+        api = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = api.handle(self.path)
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Shut the server down"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+    
+    def handle(self, raw_path):
+        """Route one request; returns (status, JSON body)"""
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+        
+        if self.latency:
+            time.sleep(self.latency)
+        if throttle:
+            return 400, {'error': {
+                'message': '(#4) Application request limit reached',
+                'type': 'OAuthException',
+                'code': 4,
+            }}
+        
+        parsed = urlparse(raw_path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        parts = [part for part in parsed.path.split('/') if part]
+        if parts and parts[0].startswith('v') and parts[0][1:].replace('.', '').isdigit():
+            parts = parts[1:]
+        
+        if parts == ['me']:
+            return 200, {'id': 'bench_user', 'name': 'Bench User'}
+        if parts == ['me', 'posts']:
+            return 200, self._page(self.posts, query, '/me/posts')
+        if len(parts) == 2 and parts[1] == 'comments' and parts[0] in self.comments:
+            return 200, self._page(self.comments[parts[0]], query, f'/{parts[0]}/comments')
+        
+        return 404, {'error': {'message': f'Unknown path {parsed.path}', 'code': 803}}
+    
+    def _page(self, items, query, path):
+        """One page of items with Graph-style cursors"""
+        start = int(query.get('after') or 0)
+        limit = min(int(query.get('limit') or self.page_size), self.page_size)
+        page = items[start:start + limit]
+        
+        # Raw Graph API comments carry the author under 'from'
+        if path.endswith('/comments'):
+            page = [
+                {**{k: v for k, v in c.items() if k not in ('author', 'author_id')},
+                 'from': {'id': c['author_id'], 'name': c['author']}}
+                for c in page
+            ]
+        
+        body = {'data': page, 'paging': {'cursors': {'before': str(start), 'after': str(start + len(page))}}}
+        if start + limit < len(items):
+            body['paging']['next'] = f'{self.url}{path}?limit={limit}&after={start + limit}'
+        return body
+
+
+@contextmanager
+def graph_redirect(api_url):
+    """Send requests for graph.facebook.com to the fake API instead"""
+    import requests
+    
+    original = requests.Session.request
+    
+    def request(session, method, url, *args, **kwargs):
+        if isinstance(url, str):
+            url = url.replace('https://graph.facebook.com', api_url, 1)
+        return original(session, method, url, *args, **kwargs)
+    
+    requests.Session.request = request
+    try:
+        yield
+    finally:
+        requests.Session.request = original
+
+
+def bench_comment_formats(num_comments=100_000):
+    """Compare write/read time and size of the comment export formats"""
+    print("\n" + "="*70)
+    print(f"Comment Export Formats ({num_comments:,} comments)".center(70))
+    print("="*70)
+    
+    from comment_formats import (
+        flatten_comments, iter_jsonl, read_columnar, write_columnar, write_json, write_jsonl,
+    )
+    
+    posts = make_posts(num_comments // 100, 100)
+    results = {}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        def read_json(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return [(c['comment_text'], c['author_id']) for c in data['comments']]
+        
+        def read_jsonl(path):
+            return [(c['comment_text'], c['author_id']) for c in iter_jsonl(path)]
+        
+        def read_columns(path):
+            columns = read_columnar(path, columns=['comment_text', 'author_id'])
+            return list(zip(columns['comment_text'], columns['author_id']))
+        
+        cases = [
+            ('json', 'comments.json',
+             lambda path: write_json(flatten_comments(posts), path), read_json),
+            ('jsonl', 'comments.jsonl',
+             lambda path: write_jsonl(flatten_comments(posts), path), read_jsonl),
+            ('columnar', 'comments.fbcol',
+             lambda path: write_columnar(flatten_comments(posts), path), read_columns),
+            ('columnar (raw)', 'comments_raw.fbcol',
+             lambda path: write_columnar(flatten_comments(posts), path, compress=False),
+             read_columns),
+        ]
+        
+        print(f"\n{'format':<16}{'write s':>10}{'read s':>10}{'size MB':>10}")
+        for name, filename, write, read in cases:
+            path = os.path.join(tmp, filename)
+            _, write_s = timed(write, path)
+            rows, read_s = timed(read, path)
+            assert len(rows) == num_comments, f"{name}: wrong row count"
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            results[name] = {'write_s': write_s, 'read_s': read_s, 'size_mb': size_mb}
+            print(f"{name:<16}{write_s:>10.3f}{read_s:>10.3f}{size_mb:>10.2f}")
+    
+    return results
+
+
+def bench_comment_scanner(num_comments=200_000, lexicon_size=2000):
+    """Measure comment scanning throughput, single process and across cores"""
+    print("\n" + "="*70)
+    print(f"Comment Scanner ({num_comments:,} comments, {lexicon_size:,} terms)".center(70))
+    print("="*70)
+    
+    from comment_formats import flatten_comments
+    from comment_scanner import CommentScanner
+    
+    terms = [f'badword{i}' for i in range(lexicon_size)]
+    patterns = [r'k+i+l+l+\s+yourself', r'\bh[a@]te\s+you\b']
+    scanner = CommentScanner(terms, patterns)
+    
+    comments = list(flatten_comments(make_posts(num_comments // 100, 100)))
+    for i in range(0, len(comments), 50):
+        comments[i]['comment_text'] += f' badword{i % lexicon_size}'
+    
+    results = {}
+    workers_list = sorted({1, os.cpu_count() or 1})
+    print(f"\n{'workers':<10}{'seconds':>10}{'flagged':>10}{'comments/min':>16}")
+    for workers in workers_list:
+        flagged, seconds = timed(scanner.scan, comments, workers=workers)
+        per_minute = num_comments / seconds * 60
+        results[workers] = {'seconds': seconds, 'flagged': len(flagged), 'per_minute': per_minute}
+        print(f"{workers:<10}{seconds:>10.3f}{len(flagged):>10}{per_minute:>16,.0f}")
+    
+    return results
+
+
+def bench_comment_analytics(num_comments=1_000_000):
+    """Load an export with many comments and run the aggregations"""
+    print("\n" + "="*70)
+    print(f"Comment Analytics ({num_comments:,} comments)".center(70))
+    print("="*70)
+    
+    from bisect import bisect_right
+    from collections import Counter
+    from comment_analytics import LIKE_COUNT_BINS, CommentTable
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'facebook_data_bench.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'metadata': {}, 'posts': make_posts(num_comments // 1000, 1000)}, f)
+        
+        table, load_s = timed(CommentTable.from_exports, [path])
+        summary, aggregate_s = timed(table.summary)
+        
+        # The same summary from a json.load and a loop over every comment
+        def loop_baseline():
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            seen = set()
+            per_author = Counter()
+            names = {}
+            per_hour = [0] * 24
+            labels = list(summary['like_count_distribution'])
+            histogram = dict.fromkeys(labels, 0)
+            likes = []
+            for post in data['posts']:
+                for comment in post['comments']:
+                    if comment['id'] in seen:
+                        continue
+                    seen.add(comment['id'])
+                    per_author[comment['author_id']] += 1
+                    names.setdefault(comment['author_id'], comment['author'])
+                    per_hour[int(comment['created_time'][11:13])] += 1
+                    histogram[labels[bisect_right(LIKE_COUNT_BINS, comment['like_count']) - 1]] += 1
+                    likes.append(comment['like_count'])
+            likes.sort()
+            last = len(likes) - 1
+            return {
+                'total_comments': len(likes),
+                'total_posts': len(data['posts']),
+                'total_authors': len(per_author),
+                'top_commenters': [
+                    {'author_id': author_id, 'author': names[author_id], 'comments': count}
+                    for author_id, count in per_author.most_common(10)
+                ],
+                'comments_per_hour': per_hour,
+                'like_count_distribution': histogram,
+                'like_count_percentiles': {
+                    str(p): likes[min(last, max(0, round(p / 100 * last)))] for p in (50, 90, 99)
+                },
+            }
+        
+        baseline, baseline_s = timed(loop_baseline)
+    
+    assert len(table) == num_comments, "Wrong comment count"
+    assert summary == baseline, "Column summary differs from the nested loop"
+    total_s = load_s + aggregate_s
+    print(f"\n{'load s':>10}{'aggregate s':>14}{'total s':>10}{'nested-loop s':>16}")
+    print(f"{load_s:>10.3f}{aggregate_s:>14.3f}{total_s:>10.3f}{baseline_s:>16.3f}")
+    print(f"\nColumns vs nested loop: {baseline_s / total_s:.2f}x")
+    return {
+        'load_s': load_s,
+        'aggregate_s': aggregate_s,
+        'baseline_s': baseline_s,
+        'speedup': baseline_s / total_s,
+    }
+
+
+def bench_record_memory(num_comments=500_000):
+    """Compare peak memory of dict posts against slotted Post/Comment records"""
+    print("\n" + "="*70)
+    print(f"Post/Comment Record Memory ({num_comments:,} comments)".center(70))
+    print("="*70)
+    
+    import gc
+    import tracemalloc
+    from comment_formats import flatten_comments
+    from models import Post, iter_flat
+    
+    # Posts arrive one at a time, as from the API or ExportReader.iter_posts
+    def build_dicts():
+        posts = [json.loads(post) for post in raw_posts]
+        flat = list(flatten_comments(posts))
+        return posts, flat
+    
+    def build_records():
+        posts = [Post.from_dict(json.loads(post)) for post in raw_posts]
+        flat = list(iter_flat(posts))
+        return posts, flat
+    
+    raw_posts = [json.dumps(post) for post in make_posts(num_comments // 500, 500)]
+    results = {}
+    print(f"\n{'representation':<16}{'peak MB':>10}{'seconds':>10}")
+    for name, build in (('dicts', build_dicts), ('records', build_records)):
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        data = build()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(data[1]) == num_comments, f"{name}: wrong comment count"
+        del data
+        results[name] = {'peak_mb': peak / (1024 * 1024), 'seconds': seconds}
+        print(f"{name:<16}{results[name]['peak_mb']:>10.1f}{seconds:>10.3f}")
+    
+    return results
+
+
+def bench_get_posts(num_posts=100, comments_per_post=50, latency=0.01, throttle_every=0, comment_workers=8):
+    """Fetch posts with comments end to end from the fake Graph API, sequentially and concurrently"""
+    print("\n" + "="*70)
+    print(f"get_posts via Fake Graph API ({num_posts} posts, {latency * 1000:.0f} ms latency)".center(70))
+    print("="*70)
+    
+    try:
+        from facebook_fetcher import FacebookDataFetcher
+    except ImportError as e:
+        print(f"\n  Skipped: {e}")
+        return None
+    from comment_stage import download_posts
+    
+    def sequential():
+        return FacebookDataFetcher('bench_token').get_posts(limit=num_posts)
+    
+    def concurrent():
+        posts, _ = download_posts(FacebookDataFetcher('bench_token'),
+                                  lambda: FacebookDataFetcher('bench_token'),
+                                  num_posts, workers=comment_workers)
+        return posts
+    
+    results = {}
+    print(f"\n{'':<22}{'posts':>8}{'comments':>10}{'requests':>10}{'throttled':>11}{'seconds':>10}{'posts/s':>10}")
+    for label, run in (('sequential', sequential), (f'{comment_workers}_comment_workers', concurrent)):
+        with FakeGraphAPI(num_posts, comments_per_post, latency=latency,
+                          throttle_every=throttle_every) as api:
+            with graph_redirect(api.url):
+                posts, seconds = timed(run)
+        
+        comments = sum(len(post.get('comments') or []) for post in posts)
+        results[label] = {
+            'seconds': seconds,
+            'posts': len(posts),
+            'comments': comments,
+            'requests': api.requests,
+            'throttled': api.throttled,
+            'posts_per_second': len(posts) / seconds if seconds else 0.0,
+        }
+        print(f"{label:<22}{len(posts):>8}{comments:>10}{api.requests:>10}{api.throttled:>11}"
+              f"{seconds:>10.3f}{results[label]['posts_per_second']:>10.1f}")
+    
+    speedup = results['sequential']['seconds'] / max(results[label]['seconds'], 1e-9)
+    print(f"\n  {comment_workers} comment workers: {speedup:.1f}x faster")
+    return results
+
+
+def bench_exports(num_posts=1000, comments_per_post=200):
+    """Time and peak memory of the download export and the comment exports"""
+    num_comments = num_posts * comments_per_post
+    print("\n" + "="*70)
+    print(f"Exports ({num_posts:,} posts, {num_comments:,} comments)".center(70))
+    print("="*70)
+    
+    from comment_formats import FORMATS, export_comments
+    
+    posts = make_posts(num_posts, comments_per_post)
+    user_info = {'id': 'bench_user', 'name': 'Bench User'}
+    results = {}
+    cwd = os.getcwd()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # The exporters write to data/ under the working directory
+        os.chdir(tmp)
+        try:
+            os.makedirs('data', exist_ok=True)
+            runs = []
+            try:
+                from data_exporter import DataExporter
+            except ImportError as e:
+                print(f"\n  Skipped posts_with_comments: {e}")
+            else:
+                exporter = DataExporter()
+                runs.append(('posts_with_comments', lambda: exporter.export_posts_with_comments(posts, user_info)))
+            # The export-comments command path
+            for fmt in FORMATS:
+                runs.append((f'comments_{fmt}', lambda fmt=fmt: export_comments(posts, fmt)))
+            print(f"\n{'export':<22}{'seconds':>10}{'peak MB':>10}{'size MB':>10}{'comments/s':>14}")
+            for name, run in runs:
+                path, seconds, peak_mb = traced(run)
+                size_mb = os.path.getsize(path) / (1024 * 1024)
+                results[name] = {
+                    'seconds': seconds,
+                    'peak_mb': peak_mb,
+                    'size_mb': size_mb,
+                    'comments_per_second': num_comments / seconds,
+                }
+                print(f"{name:<22}{seconds:>10.3f}{peak_mb:>10.1f}{size_mb:>10.2f}"
+                      f"{num_comments / seconds:>14,.0f}")
+        finally:
+            os.chdir(cwd)
+    
+    return results
+
+
+def bench_view_info(num_files=50, posts_per_file=200, comments_per_post=100):
+    """Time the 'View export information' scan over a large data directory"""
+    print("\n" + "="*70)
+    print(f"View Info ({num_files} exports of {posts_per_file * comments_per_post:,} comments)".center(70))
+    print("="*70)
+    
+    try:
+        from main import FacebookDataDownloaderCLI
+    except ImportError as e:
+        print(f"\n  Skipped: {e}")
+        return None
+    
+    posts = make_posts(posts_per_file, comments_per_post)
+    cwd = os.getcwd()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs('data')
+            for i in range(num_files):
+                write_export(os.path.join('data', f'facebook_data_{i:04d}.json'), posts)
+            
+            cli = FacebookDataDownloaderCLI()
+            files = cli._find_json_files()
+            total_mb = sum(os.path.getsize(f) for f in files) / (1024 * 1024)
+            info, seconds, peak_mb = traced(cli.collect_info, files)
+        finally:
+            os.chdir(cwd)
+    
+    assert all('error' not in entry for entry in info), "View info failed on a file"
+    print(f"\n{'files':>8}{'data MB':>10}{'seconds':>10}{'peak MB':>10}")
+    print(f"{len(files):>8}{total_mb:>10.1f}{seconds:>10.3f}{peak_mb:>10.2f}")
+    return {'seconds': seconds, 'peak_mb': peak_mb, 'files_per_second': len(files) / seconds}
+
+
+BENCHMARKS = {
+    'formats': bench_comment_formats,
+    'scanner': bench_comment_scanner,
+    'analytics': bench_comment_analytics,
+    'records': bench_record_memory,
+    'get_posts': bench_get_posts,
+    'exports': bench_exports,
+    'view_info': bench_view_info,
+}
+
+
+def flatten_results(results, prefix=''):
+    """Flatten nested result dictionaries into {'a.b.c': number}"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten_results(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Find measurements that got worse than the baseline by more than tolerance
+    
+    Timings ('seconds', '_s') and memory ('_mb') are lower-is-better,
+    throughput ('per_second', 'per_minute') is higher-is-better; counts
+    are not compared.
+    
+    Returns:
+        List of (metric, baseline value, current value) tuples
+    """
+    current = flatten_results(results)
+    regressions = []
+    for name, old in flatten_results(baseline).items():
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        if name.endswith(('seconds', '_s', '_mb')):
+            worse = new > old * (1 + tolerance)
+        elif name.endswith(('per_second', 'per_minute')):
+            worse = new < old * (1 - tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmarks and check them against the stored baseline"""
+    parser = argparse.ArgumentParser(description='Benchmark the download/export pipeline')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='Run only these benchmarks')
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the new baseline')
+    parser.add_argument('--no-compare', action='store_true',
+                        help='Only print results, without checking them against a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown/memory growth before a regression is reported (default: 0.25)')
+    args = parser.parse_args(argv)
+    
+    print("\n" + "="*70)
+    print("Facebook Data Downloader - Benchmarks".center(70))
+    print("="*70)
+    
+    results = {}
+    skipped = []
+    for name in args.only or BENCHMARKS:
+        result = BENCHMARKS[name]()
+        if result is None:
+            skipped.append(name)
+        else:
+            results[name] = result
+    
+    print("\n" + "="*70)
+    if skipped:
+        print(f"Skipped: {', '.join(skipped)}")
+    
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return True
+    
+    if args.no_compare:
+        return True
+    
+    # Without a baseline file the run only prints results
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, results not compared "
+              f"(run with --save-baseline to store one)")
+        return True
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"✗ No baseline for {', '.join(missing)} in {args.baseline} "
+              f"(run with --save-baseline --only {' '.join(missing)} to add it)")
+        return False
+    
+    baseline = {name: value for name, value in baseline.items() if name in results}
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    
+    if not regressions:
+        print(f"✓ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return True
+    
+    print(f"✗ {len(regressions)} regression(s) against {args.baseline}:")
+    for name, old, new in regressions:
+        print(f"  {name}: {old:.4g} -> {new:.4g}")
+    return False
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
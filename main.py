@@ -6,25 +6,57 @@ Download posts, comments, and media from Facebook for analysis
 
 import os
 import sys
+import json
+import time
 import argparse
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
 
 # Add src directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from facebook_auth import FacebookAuth
-from facebook_fetcher import FacebookDataFetcher
 from data_exporter import DataExporter
+from sqlite_store import SQLiteStore
+from export_reader import ExportReader
+from export_merger import latest_export
+from comment_formats import FORMATS, export_comments
+from models import iter_flat
+from multi_account import load_manifest, run_accounts, summarize_results, write_summary
+
+# Exit codes for headless runs
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_AUTH = 3
+
+# Reply levels fetched when replies are requested from the menu
+DEFAULT_REPLY_DEPTH = 2
+
+# Methods timed when run metrics are enabled
+FETCHER_METHODS = ('_make_request', 'get_user_info', 'get_posts', 'get_comments', 'get_post_with_details')
+EXPORTER_METHODS = ('export_posts_with_comments', 'export_comments_only', 'get_file_info')
 
 
 class FacebookDataDownloaderCLI:
     """Main CLI application for Facebook data downloading"""
     
-    def __init__(self):
+    def __init__(self, token_file='data/token.json'):
         self.auth = None
         self.fetcher = None
         self.exporter = DataExporter()
-        self.token_file = 'data/token.json'
+        self.token_file = token_file
+        self.store_file = 'data/facebook_data.db'
+        self.store = None
+        self.media_stats = None
+        self.reply_stats = None
+        self.comment_stats = None
+        self.request_budget = None
+        self.backoff = None
+        self.metrics = None
+        self.tokens = None
+        self.token = None
+        self.watcher = None
+        self.cache = None
     
     def print_banner(self):
         """Print application banner"""
@@ -47,6 +79,9 @@ class FacebookDataDownloaderCLI:
     
     def handle_authentication(self):
         """Handle Facebook authentication"""
+        # Imported here so commands that never touch the API start fast
+        from facebook_auth import FacebookAuth
+        
         try:
             self.auth = FacebookAuth()
             
@@ -58,11 +93,10 @@ class FacebookDataDownloaderCLI:
                     token = self.auth.load_token(self.token_file)
                     if token:
                         print("✓ Token loaded successfully")
-                        self.fetcher = FacebookDataFetcher(token)
                         
-                        # Test connection
-                        if self.auth.test_connection():
-                            user_info = self.fetcher.get_user_info()
+                        # Test connection (reuses a recent check)
+                        user_info = self.open_session(token)
+                        if user_info:
                             print(f"✓ Connected as: {user_info.get('name', 'Unknown')}")
                             return True
                         else:
@@ -74,8 +108,7 @@ class FacebookDataDownloaderCLI:
             
             if token:
                 self.auth.save_token(self.token_file)
-                self.fetcher = FacebookDataFetcher(token)
-                user_info = self.fetcher.get_user_info()
+                user_info = self.open_session(token) or {}
                 print(f"✓ Successfully authenticated as: {user_info.get('name', 'Unknown')}")
                 return True
             
@@ -83,6 +116,104 @@ class FacebookDataDownloaderCLI:
             print(f"✗ Authentication failed: {e}")
             return False
     
+    def connect(self):
+        """
+        Load the saved token without prompting and verify it
+        
+        Returns:
+            User info dictionary, or None if there is no valid saved token
+        """
+        from facebook_auth import FacebookAuth
+        
+        self.auth = FacebookAuth()
+        if not os.path.exists(self.token_file):
+            return None
+        
+        token = self.auth.load_token(self.token_file)
+        if not token:
+            return None
+        return self.open_session(token)
+    
+    def open_session(self, saved_token):
+        """
+        Set up the fetcher for the saved token
+        
+        The saved token is swapped for a long-lived one, validated (a recent
+        validation is reused instead of another round trip) and then kept
+        fresh by a background refresh before it expires.
+        
+        Returns:
+            User info dictionary, or None if the token is invalid
+        """
+        from token_manager import TokenManager
+        
+        if self.tokens:
+            self.tokens.stop()
+        self.tokens = TokenManager(self.token_file)
+        self.set_token(self.tokens.resolve(saved_token))
+        
+        user_info = self.tokens.validate(self.fetcher.get_user_info)
+        if user_info:
+            self.tokens.start_refresh(self.set_token)
+        return user_info
+    
+    def new_fetcher(self, token):
+        """A fetcher for the token, with metrics, request budget, throttling backoff and cache if enabled"""
+        from facebook_fetcher import FacebookDataFetcher
+        
+        fetcher = FacebookDataFetcher(token)
+        # Timed innermost, so every attempt that reaches the API is counted
+        # and cache hits are not; reply and comment workers are timed too
+        if self.metrics:
+            self.metrics.instrument(fetcher, FETCHER_METHODS, 'fetcher')
+        # Inside the cache, so cache hits cost nothing; every retry is paid for
+        if self.request_budget:
+            from comment_stage import limit_requests
+            limit_requests(fetcher, self.request_budget)
+        if self.backoff:
+            self.backoff.wrap(fetcher)
+        if self.cache:
+            self.cache.wrap(fetcher, scope=token)
+        return fetcher
+    
+    def set_token(self, token):
+        """Point new API calls at the given token"""
+        fetcher = self.new_fetcher(token)
+        self.fetcher = fetcher
+        self.token = token
+        if self.watcher:
+            self.watcher.fetcher = fetcher
+    
+    def enable_cache(self, cache):
+        """Serve repeated Graph API reads from the given ResponseCache"""
+        self.cache = cache
+        if self.fetcher:
+            cache.wrap(self.fetcher, scope=self.token)
+    
+    def enable_request_budget(self, budget):
+        """Share one RequestBudget between every fetcher made from now on"""
+        self.request_budget = budget
+        if self.fetcher:
+            from comment_stage import limit_requests
+            limit_requests(self.fetcher, budget)
+    
+    def enable_backoff(self, backoff):
+        """Retry rate-limited Graph API requests with the given ThrottleBackoff"""
+        self.backoff = backoff
+        if self.fetcher:
+            backoff.wrap(self.fetcher)
+    
+    def enable_metrics(self, metrics):
+        """Time fetcher and exporter calls into the given RunMetrics"""
+        self.metrics = metrics
+        metrics.instrument(self.exporter, EXPORTER_METHODS, 'exporter')
+        if self.fetcher:
+            metrics.instrument(self.fetcher, FETCHER_METHODS, 'fetcher')
+    
+    def _phase(self, name):
+        """Time a block under a phase name when metrics are enabled"""
+        return self.metrics.phase(name) if self.metrics else nullcontext()
+    
     def handle_download(self):
         """Handle downloading posts and comments"""
         if not self.fetcher:
@@ -91,9 +222,10 @@ class FacebookDataDownloaderCLI:
         
         try:
             # Get limit from user
-            limit_input = input("\nHow many posts to download? (default: 10, max: 100): ").strip()
+            limit_input = input("\nHow many posts to download? (default: 10): ").strip()
             limit = int(limit_input) if limit_input.isdigit() else 10
-            limit = min(max(limit, 1), 100)
+            media = input("Download pictures and attachments too? (y/n): ").strip().lower() == 'y'
+            replies = input("Download reply threads too? (y/n): ").strip().lower() == 'y'
             
             # Fetch user info and posts
             print(f"\nFetching user information...")
@@ -101,23 +233,80 @@ class FacebookDataDownloaderCLI:
             print(f"✓ User: {user_info.get('name', 'Unknown')}")
             
             print(f"\nStarting download (this may take a while)...")
-            posts = self.fetcher.get_posts(limit=limit)
+            filepath = self.download(limit, user_info, media=media,
+                                     reply_depth=DEFAULT_REPLY_DEPTH if replies else 0)
             
-            if posts:
-                # Export to JSON
-                filepath = self.exporter.export_posts_with_comments(posts, user_info)
+            if filepath:
                 file_info = self.exporter.get_file_info(filepath)
                 
                 print(f"\n✓ Data successfully exported!")
                 print(f"  File: {file_info['filename']}")
                 print(f"  Size: {file_info['size_mb']} MB")
                 print(f"  Location: {filepath}")
+                if self.reply_stats:
+                    print(f"  Replies: {self.reply_stats['replies']} in "
+                          f"{self.reply_stats['depth']} level(s)")
+                if self.media_stats:
+                    print(f"  Media: {self.media_stats['downloaded']} downloaded, "
+                          f"{self.media_stats['skipped']} already stored, "
+                          f"{self.media_stats['failed']} failed")
             else:
                 print("✗ No posts found")
             
         except Exception as e:
             print(f"✗ Download failed: {e}")
     
+    def download(self, limit, user_info, media=False, reply_depth=0, reply_workers=8, comment_workers=1):
+        """
+        Download posts with comments and export them to JSON
+        
+        With comment_workers > 1, the posts are fetched first and then the
+        comments of that many posts at a time (see comment_stage.download_posts).
+        With media=True, post pictures and attachments are saved under
+        data/media first and their local paths are recorded in the export.
+        With reply_depth > 0, reply threads are expanded under each comment
+        up to that many levels (see reply_threads.expand_replies).
+        
+        Returns:
+            Path to the export file, or None if no posts were found
+        """
+        # get_posts follows the paging links, so there is no upper bound
+        limit = max(limit, 1)
+        self.comment_stats = None
+        with self._phase('fetch'):
+            if comment_workers > 1:
+                from comment_stage import download_posts
+                posts, self.comment_stats = download_posts(
+                    self.fetcher, lambda: self.new_fetcher(self.token), limit, workers=comment_workers)
+            else:
+                posts = self.fetcher.get_posts(limit=limit)
+        
+        if not posts:
+            return None
+        
+        self.reply_stats = None
+        if reply_depth > 0:
+            from reply_threads import expand_replies, thread_local_fetch
+            
+            # One fetcher per worker thread, all on the current token
+            fetch_replies = thread_local_fetch(lambda: self.new_fetcher(self.token))
+            with self._phase('replies'):
+                self.reply_stats = expand_replies(posts, fetch_replies, max_depth=reply_depth,
+                                                  workers=reply_workers)
+        
+        self.media_stats = None
+        if media:
+            from media_downloader import MediaDownloader
+            with self._phase('media'):
+                self.media_stats = MediaDownloader().download_posts(posts)
+        
+        with self._phase('export'):
+            filepath = self.exporter.export_posts_with_comments(posts, user_info)
+            if self.reply_stats:
+                from reply_threads import attach_replies
+                attach_replies(filepath, posts)
+            return filepath
+    
     def handle_export_comments(self):
         """Handle exporting comments for analysis"""
         json_files = self._find_json_files()
@@ -135,12 +324,12 @@ class FacebookDataDownloaderCLI:
             if 1 <= choice <= len(json_files):
                 selected_file = json_files[choice - 1]
                 
-                # Load and re-export
-                import json
-                with open(selected_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                fmt = input(f"Output format ({'/'.join(FORMATS)}, default: json): ").strip().lower() or 'json'
+                if fmt not in FORMATS:
+                    print("✗ Invalid format")
+                    return
                 
-                filepath = self.exporter.export_comments_only(data.get('posts', []))
+                filepath = self.export_comments_file(selected_file, fmt)
                 file_info = self.exporter.get_file_info(filepath)
                 
                 print(f"\n✓ Comments exported successfully!")
@@ -151,6 +340,36 @@ class FacebookDataDownloaderCLI:
         except Exception as e:
             print(f"✗ Export failed: {e}")
     
+    def export_comments_file(self, selected_file, fmt='json'):
+        """Export the comments of one downloaded file in the given format"""
+        # Read posts back from the indexed store
+        store = self._get_store()
+        store.prune(self._find_json_files())
+        store.sync_file(selected_file)
+        posts = store.get_post_records(selected_file)
+        
+        # Written here rather than by DataExporter so replies keep their parent_id
+        return export_comments(posts, fmt)
+    
+    def scan_comments_file(self, selected_file, lexicon_file, workers=1):
+        """
+        Scan the comments of one downloaded file against a lexicon
+        
+        Returns:
+            Tuple of (flagged export path, comments scanned, comments flagged)
+        """
+        from comment_scanner import CommentScanner, export_flagged
+        
+        scanner = CommentScanner.from_file(lexicon_file)
+        
+        store = self._get_store()
+        store.sync_file(selected_file)
+        comments = list(iter_flat(store.get_post_records(selected_file)))
+        
+        flagged = scanner.scan(comments, workers=workers)
+        filepath = export_flagged(flagged, len(comments), lexicon=lexicon_file)
+        return filepath, len(comments), len(flagged)
+    
     def handle_view_info(self):
         """Show information about downloaded data"""
         json_files = self._find_json_files()
@@ -162,43 +381,78 @@ class FacebookDataDownloaderCLI:
         print("\nDownloaded Data Files:")
         print("-"*70)
         
-        import json
         total_posts = 0
         total_comments = 0
         
+        for info in self.collect_info(json_files):
+            if 'error' in info:
+                print(f"Error reading {info['file']}: {info['error']}")
+                continue
+            
+            print(f"\nFile: {info['filename']}")
+            print(f"  Posts: {info['posts']}")
+            print(f"  Comments: {info['comments']}")
+            print(f"  Size: {info['size_mb']} MB")
+            
+            total_posts += info['posts']
+            total_comments += info['comments']
+        
+        print("\n" + "-"*70)
+        print(f"Total: {total_posts} posts, {total_comments} comments")
+    
+    def collect_info(self, json_files):
+        """Get post/comment counts and size for each export file"""
+        results = []
         for file in json_files:
             try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                metadata = data.get('metadata', {})
-                posts = metadata.get('total_posts', 0)
-                comments = metadata.get('total_comments', 0)
-                
+                # Only the metadata block is read, not the posts
+                with ExportReader(file) as reader:
+                    metadata = reader.read_metadata()
                 file_info = self.exporter.get_file_info(file)
                 
-                print(f"\nFile: {file_info['filename']}")
-                print(f"  Posts: {posts}")
-                print(f"  Comments: {comments}")
-                print(f"  Size: {file_info['size_mb']} MB")
-                
-                total_posts += posts
-                total_comments += comments
+                results.append({
+                    'file': file,
+                    'filename': file_info['filename'],
+                    'posts': metadata.get('total_posts', 0),
+                    'comments': metadata.get('total_comments', 0),
+                    'size_mb': file_info['size_mb'],
+                })
                 
             except Exception as e:
-                print(f"Error reading {file}: {e}")
+                results.append({'file': file, 'error': str(e)})
         
-        print("\n" + "-"*70)
-        print(f"Total: {total_posts} posts, {total_comments} comments")
+        return results
+    
+    def _get_store(self):
+        """Open the local SQLite store on first use"""
+        if self.store is None:
+            self.store = SQLiteStore(self.store_file)
+        return self.store
     
     def _find_json_files(self):
-        """Find all JSON export files"""
+        """
+        Find all JSON export files
+        
+        A merged file stands in for the files it was merged from, so those
+        are left out while it exists and nothing is counted twice.
+        """
         data_dir = Path('data')
-        if data_dir.exists():
-            return sorted([
-                str(f) for f in data_dir.glob('facebook_data_*.json')
-            ])
-        return []
+        if not data_dir.exists():
+            return []
+        files = sorted(str(f) for f in data_dir.glob('facebook_data_*.json'))
+        
+        merged_from = set()
+        for file in files:
+            if not Path(file).name.startswith('facebook_data_merged_'):
+                continue
+            try:
+                with ExportReader(file) as reader:
+                    sources = reader.read_metadata().get('merged_from', [])
+            except (OSError, ValueError):
+                continue
+            merged_from.update(os.path.abspath(source) for source in sources)
+        
+        return [f for f in files if os.path.abspath(f) not in merged_from]
     
     def run(self):
         """Main CLI loop"""
@@ -224,8 +478,330 @@ class FacebookDataDownloaderCLI:
                 print("✗ Invalid choice. Please try again.")
 
 
-def main():
-    """Entry point for the application"""
+def emit(args, event, message=None, **fields):
+    """Report headless progress as a JSON line (--json) or as plain text"""
+    if args.json:
+        print(json.dumps({'event': event, **fields}), flush=True)
+    elif message:
+        print(message, flush=True)
+
+
+def command_auth(cli, args):
+    """Verify the saved token, running the browser flow if needed"""
+    user_info = cli.connect()
+    
+    if user_info is None:
+        if args.check:
+            emit(args, 'auth_failed', "✗ No valid token", token_file=cli.token_file)
+            return EXIT_AUTH
+        
+        emit(args, 'auth_started', "Starting new authentication flow...")
+        token = cli.auth.authenticate()
+        if not token:
+            emit(args, 'auth_failed', "✗ Authentication failed", token_file=cli.token_file)
+            return EXIT_AUTH
+        
+        cli.auth.save_token(cli.token_file)
+        user_info = cli.connect() or {}
+    
+    expires_at = cli.tokens.expires_at if cli.tokens else None
+    message = f"✓ Connected as: {user_info.get('name', 'Unknown')}"
+    if expires_at:
+        message += f" (token valid until {datetime.fromtimestamp(expires_at):%Y-%m-%d %H:%M})"
+    emit(args, 'authenticated', message,
+         user_id=user_info.get('id'), name=user_info.get('name'), token_expires_at=expires_at)
+    return EXIT_OK
+
+
+def command_download(cli, args):
+    """Download posts and comments using the saved token"""
+    if args.cache:
+        from response_cache import ResponseCache
+        cli.enable_cache(ResponseCache(args.cache_file))
+    if args.requests_per_minute:
+        from comment_watcher import RequestBudget
+        cli.enable_request_budget(RequestBudget(args.requests_per_minute))
+    if args.throttle_retries > 0:
+        from throttle_backoff import ThrottleBackoff
+        cli.enable_backoff(ThrottleBackoff(retries=args.throttle_retries))
+    
+    user_info = cli.connect()
+    if user_info is None:
+        emit(args, 'auth_failed', "✗ No valid token, run the auth command first",
+             token_file=cli.token_file)
+        return EXIT_AUTH
+    
+    emit(args, 'download_started', f"Downloading up to {args.limit} posts...",
+         user_id=user_info.get('id'), limit=args.limit)
+    
+    filepath = cli.download(args.limit, user_info, media=args.media,
+                            reply_depth=args.replies, reply_workers=args.reply_workers,
+                            comment_workers=args.comment_workers)
+    if not filepath:
+        emit(args, 'download_empty', "✗ No posts found")
+        return EXIT_FAILURE
+    
+    if cli.comment_stats:
+        emit(args, 'comments_finished', f"✓ Comments: {cli.comment_stats['comments']} on "
+             f"{cli.comment_stats['posts']} posts, {cli.comment_stats['failed']} failed posts",
+             **cli.comment_stats)
+    
+    if cli.reply_stats:
+        emit(args, 'replies_finished', f"✓ Replies: {cli.reply_stats['replies']} in "
+             f"{cli.reply_stats['depth']} level(s), {cli.reply_stats['failed']} failed requests",
+             **cli.reply_stats)
+    
+    if cli.media_stats:
+        emit(args, 'media_finished', f"✓ Media: {cli.media_stats['downloaded']} downloaded, "
+             f"{cli.media_stats['skipped']} already stored, {cli.media_stats['failed']} failed",
+             **cli.media_stats)
+    
+    if cli.backoff and cli.backoff.stats['throttled']:
+        emit(args, 'throttled', f"✓ Rate limited {cli.backoff.stats['throttled']} times, "
+             f"{cli.backoff.stats['retries']} retries, {cli.backoff.stats['gave_up']} given up",
+             **cli.backoff.stats)
+    
+    if cli.cache:
+        cache_stats = cli.cache.summary()
+        emit(args, 'cache_stats', f"✓ Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses",
+             **cache_stats)
+    
+    file_info = cli.exporter.get_file_info(filepath)
+    emit(args, 'download_finished', f"✓ Data exported to {filepath}",
+         file=filepath, size_mb=file_info['size_mb'])
+    return EXIT_OK
+
+
+def command_export_comments(cli, args):
+    """Export the comments of a downloaded file"""
+    selected_file = args.file
+    if not selected_file:
+        selected_file = latest_export(cli._find_json_files())
+        if not selected_file:
+            emit(args, 'export_failed', "✗ No downloaded data files found")
+            return EXIT_FAILURE
+    
+    filepath = cli.export_comments_file(selected_file, args.format)
+    emit(args, 'export_finished', f"✓ Comments exported to {filepath}",
+         source=selected_file, file=filepath, format=args.format)
+    return EXIT_OK
+
+
+def command_scan(cli, args):
+    """Flag offensive comments in a downloaded file"""
+    selected_file = args.file
+    if not selected_file:
+        selected_file = latest_export(cli._find_json_files())
+        if not selected_file:
+            emit(args, 'scan_failed', "✗ No downloaded data files found")
+            return EXIT_FAILURE
+    
+    filepath, scanned, flagged = cli.scan_comments_file(selected_file, args.lexicon, args.workers)
+    emit(args, 'scan_finished', f"✓ {flagged} of {scanned} comments flagged, saved to {filepath}",
+         source=selected_file, file=filepath, scanned=scanned, flagged=flagged)
+    return EXIT_OK
+
+
+def command_stats(cli, args):
+    """Aggregate comment statistics across downloaded files"""
+    from comment_analytics import CommentTable
+    
+    json_files = args.files or cli._find_json_files()
+    if not json_files:
+        emit(args, 'stats_failed', "✗ No downloaded data files found")
+        return EXIT_FAILURE
+    
+    summary = CommentTable.from_exports(json_files).summary(top=args.top)
+    
+    if args.json:
+        emit(args, 'stats', files=json_files, **summary)
+        return EXIT_OK
+    
+    print(f"{summary['total_comments']} comments by {summary['total_authors']} authors "
+          f"on {summary['total_posts']} posts ({len(json_files)} files)")
+    print("\nTop commenters:")
+    for entry in summary['top_commenters']:
+        print(f"  {entry['comments']:>8}  {entry['author'] or 'Unknown'} ({entry['author_id']})")
+    print("\nComments per hour (UTC):")
+    for hour, count in enumerate(summary['comments_per_hour']):
+        print(f"  {hour:02d}:00  {count}")
+    print("\nLike counts:")
+    for label, count in summary['like_count_distribution'].items():
+        print(f"  {label:>8}  {count}")
+    percentiles = ', '.join(f"p{p}={v}" for p, v in summary['like_count_percentiles'].items())
+    print(f"  {percentiles}")
+    return EXIT_OK
+
+
+def command_merge(cli, args):
+    """Deduplicate overlapping downloads into one compacted file"""
+    from export_merger import merge_exports
+    
+    json_files = args.files or cli._find_json_files()
+    if not json_files:
+        emit(args, 'merge_failed', "✗ No downloaded data files found")
+        return EXIT_FAILURE
+    
+    merged_file, merger = merge_exports(json_files, remove_sources=args.remove_sources)
+    with ExportReader(merged_file) as reader:
+        metadata = reader.read_metadata()
+    
+    emit(args, 'merge_finished',
+         f"✓ Merged {len(json_files)} files into {merged_file}: "
+         f"{metadata['total_posts']} posts, {metadata['total_comments']} comments "
+         f"({metadata['total_edits']} edits, {metadata['total_deleted_comments']} deleted comments)",
+         file=merged_file, sources=len(json_files), removed_sources=args.remove_sources,
+         posts=metadata['total_posts'], comments=metadata['total_comments'],
+         edits=metadata['total_edits'], deleted_comments=metadata['total_deleted_comments'])
+    return EXIT_OK
+
+
+def command_info(cli, args):
+    """Print post/comment counts for every downloaded file"""
+    results = cli.collect_info(cli._find_json_files())
+    ok = [info for info in results if 'error' not in info]
+    total_posts = sum(info['posts'] for info in ok)
+    total_comments = sum(info['comments'] for info in ok)
+    
+    for info in results:
+        if 'error' in info:
+            emit(args, 'file_error', f"Error reading {info['file']}: {info['error']}", **info)
+        else:
+            emit(args, 'file', f"{info['file']}: {info['posts']} posts, "
+                 f"{info['comments']} comments, {info['size_mb']} MB", **info)
+    
+    emit(args, 'total', f"Total: {total_posts} posts, {total_comments} comments",
+         files=len(ok), posts=total_posts, comments=total_comments)
+    return EXIT_OK if len(ok) == len(results) else EXIT_FAILURE
+
+
+def command_accounts(cli, args):
+    """Download every account in a manifest in parallel"""
+    accounts = load_manifest(args.manifest)
+    emit(args, 'accounts_started', f"Downloading {len(accounts)} accounts with {args.workers} workers...",
+         accounts=len(accounts), workers=args.workers)
+    
+    def report(result):
+        if result['status'] == 'failed':
+            message = f"✗ {result['account_id']}: {result.get('error', 'failed')}"
+        else:
+            message = f"✓ {result['account_id']}: {result['posts']} posts, {result['comments']} comments"
+        emit(args, 'account_finished', message, **result)
+    
+    start = time.perf_counter()
+    results = run_accounts(
+        accounts,
+        limit=args.limit,
+        workers=args.workers,
+        use_threads=args.threads,
+        on_result=report,
+    )
+    summary = summarize_results(results, elapsed=time.perf_counter() - start)
+    filepath = write_summary(summary)
+    
+    emit(args, 'accounts_finished',
+         f"Total: {summary['total_posts']} posts, {summary['total_comments']} comments "
+         f"({summary['failed']} failed), summary: {filepath}",
+         summary_file=filepath, **{k: v for k, v in summary.items() if k != 'results'})
+    return EXIT_OK if summary['failed'] == 0 else EXIT_FAILURE
+
+
+def command_watch(cli, args):
+    """Poll recent posts for new comments until interrupted"""
+    from comment_watcher import CommentWatcher
+    
+    user_info = cli.connect()
+    if user_info is None:
+        emit(args, 'auth_failed', "✗ No valid token, run the auth command first",
+             token_file=cli.token_file)
+        return EXIT_AUTH
+    
+    def report(post_id, records):
+        emit(args, 'new_comments', f"+ {len(records)} new comment(s) on {post_id}",
+             post_id=post_id, count=len(records), file=cli.watcher.writer.path)
+    
+    cli.watcher = CommentWatcher(
+        cli.fetcher,
+        posts_limit=max(args.posts, 1),
+        budget_per_minute=args.budget,
+        hot_interval=args.hot_interval,
+        cold_interval=args.cold_interval,
+        refresh_interval=args.refresh_interval,
+        on_comments=report,
+    )
+    emit(args, 'watch_started', f"Watching {args.posts} recent posts "
+         f"({args.budget} requests/min, Ctrl+C to stop)...",
+         posts=args.posts, budget=args.budget)
+    
+    try:
+        stats = cli.watcher.run(duration=args.duration)
+    except KeyboardInterrupt:
+        stats = cli.watcher.stats
+    
+    emit(args, 'watch_finished', f"✓ {stats['new_comments']} new comments in {stats['polls']} polls "
+         f"({stats['requests']} requests)", **stats)
+    return EXIT_OK
+
+
+COMMANDS = {
+    'auth': command_auth,
+    'download': command_download,
+    'export-comments': command_export_comments,
+    'info': command_info,
+    'scan': command_scan,
+    'stats': command_stats,
+    'merge': command_merge,
+    'accounts': command_accounts,
+    'watch': command_watch,
+}
+
+
+def run_command(args):
+    """Run one headless subcommand and return its exit code"""
+    cli = FacebookDataDownloaderCLI(token_file=args.token_file)
+    
+    metrics = None
+    if args.metrics_report or args.prometheus:
+        from run_metrics import RunMetrics
+        metrics = RunMetrics()
+        cli.enable_metrics(metrics)
+    
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    try:
+        with metrics.phase(args.command) if metrics else nullcontext():
+            exit_code = COMMANDS[args.command](cli, args)
+    except Exception as e:
+        emit(args, 'error', f"✗ {args.command} failed: {e}", command=args.command, error=str(e))
+        exit_code = EXIT_FAILURE
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            emit(args, 'profile_written', f"Profile written to {args.profile}", file=args.profile)
+    
+    if metrics:
+        metrics.set_gauge('exit_code', exit_code)
+        if cli.backoff:
+            metrics.count('fetcher.throttle_retries', cli.backoff.stats['retries'])
+        if args.metrics_report:
+            metrics.write_report(args.metrics_report)
+            emit(args, 'metrics_written', f"Run report written to {args.metrics_report}",
+                 file=args.metrics_report)
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus)
+            emit(args, 'metrics_written', f"Prometheus metrics written to {args.prometheus}",
+                 file=args.prometheus)
+    
+    return exit_code
+
+
+def build_parser():
+    """Build the argument parser with headless subcommands"""
     parser = argparse.ArgumentParser(
         description='Facebook Data Downloader - Download and analyze your Facebook data'
     )
@@ -235,6 +811,224 @@ def main():
         help='Check if environment variables are set up'
     )
     
+    # Options shared by every subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        '--token-file',
+        default='data/token.json',
+        help='Path of the saved access token (default: data/token.json)'
+    )
+    common.add_argument(
+        '--json',
+        action='store_true',
+        help='Print progress as JSON lines for scripts and schedulers'
+    )
+    common.add_argument(
+        '--metrics-report',
+        metavar='PATH',
+        help='Write a JSON run report with phase timers, counters and latencies'
+    )
+    common.add_argument(
+        '--prometheus',
+        metavar='PATH',
+        help='Write run metrics in Prometheus text format'
+    )
+    common.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='Capture a cProfile of the run (view with python -m pstats PATH)'
+    )
+    
+    subparsers = parser.add_subparsers(
+        dest='command',
+        title='commands',
+        description='Run one step without the interactive menu'
+    )
+    
+    auth_parser = subparsers.add_parser('auth', parents=[common], help='Authenticate with Facebook')
+    auth_parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Only verify the saved token, never open a browser'
+    )
+    
+    download_parser = subparsers.add_parser('download', parents=[common], help='Download posts and comments')
+    download_parser.add_argument(
+        '--limit',
+        type=int,
+        default=10,
+        help='Number of posts to download (default: 10)'
+    )
+    download_parser.add_argument(
+        '--media',
+        action='store_true',
+        help='Also download post pictures and attachments into data/media'
+    )
+    download_parser.add_argument(
+        '--replies',
+        type=int,
+        default=0,
+        metavar='DEPTH',
+        help='Also download reply threads, up to DEPTH levels under each comment (default: 0)'
+    )
+    download_parser.add_argument(
+        '--reply-workers',
+        type=int,
+        default=8,
+        help='Concurrent reply requests (default: 8)'
+    )
+    download_parser.add_argument(
+        '--comment-workers',
+        type=int,
+        default=1,
+        help='Posts whose comments are fetched at the same time (default: 1, one after another)'
+    )
+    download_parser.add_argument(
+        '--requests-per-minute',
+        type=int,
+        metavar='N',
+        help='Cap Graph API requests across all workers (default: no cap)'
+    )
+    download_parser.add_argument(
+        '--throttle-retries',
+        type=int,
+        default=5,
+        help='Retries of a rate-limited request, with randomized backoff (default: 5, 0 to disable)'
+    )
+    download_parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Reuse recent Graph API responses instead of requesting them again'
+    )
+    download_parser.add_argument(
+        '--cache-file',
+        default='data/graph_cache.db',
+        help='Response cache database (default: data/graph_cache.db)'
+    )
+    
+    export_parser = subparsers.add_parser('export-comments', parents=[common], help='Export comments for analysis')
+    export_parser.add_argument(
+        '--file',
+        help='Downloaded facebook_data_*.json file (default: the most recently exported one)'
+    )
+    export_parser.add_argument(
+        '--format',
+        choices=FORMATS,
+        default='json',
+        help='Output format (default: json)'
+    )
+    
+    subparsers.add_parser('info', parents=[common], help='Show downloaded data info')
+    
+    scan_parser = subparsers.add_parser('scan', parents=[common], help='Flag offensive comments')
+    scan_parser.add_argument(
+        '--lexicon',
+        required=True,
+        help="Lexicon file: one term per line, 're:' prefix for regular expressions"
+    )
+    scan_parser.add_argument(
+        '--file',
+        help='Downloaded facebook_data_*.json file (default: the most recently exported one)'
+    )
+    scan_parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of processes used for scanning (default: 1)'
+    )
+    
+    stats_parser = subparsers.add_parser('stats', parents=[common], help='Comment statistics across files')
+    stats_parser.add_argument(
+        '--files',
+        nargs='+',
+        help='Downloaded files to analyze (default: all facebook_data_*.json)'
+    )
+    stats_parser.add_argument(
+        '--top',
+        type=int,
+        default=10,
+        help='Number of top commenters to show (default: 10)'
+    )
+    
+    merge_parser = subparsers.add_parser('merge', parents=[common], help='Deduplicate downloads into one file')
+    merge_parser.add_argument(
+        '--files',
+        nargs='+',
+        help='Downloaded files to merge (default: all facebook_data_*.json)'
+    )
+    merge_parser.add_argument(
+        '--remove-sources',
+        action='store_true',
+        help='Delete the merged input files once the compacted file is written'
+    )
+    
+    accounts_parser = subparsers.add_parser('accounts', parents=[common], help='Download many accounts in parallel')
+    accounts_parser.add_argument(
+        '--manifest',
+        required=True,
+        help='JSON list of {"account_id": ..., "token" or "token_file": ...}'
+    )
+    accounts_parser.add_argument(
+        '--limit',
+        type=int,
+        default=10,
+        help='Number of posts to download per account (default: 10)'
+    )
+    accounts_parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Number of accounts downloaded at once (default: 4)'
+    )
+    accounts_parser.add_argument(
+        '--threads',
+        action='store_true',
+        help='Use threads instead of worker processes'
+    )
+    
+    watch_parser = subparsers.add_parser('watch', parents=[common], help='Poll recent posts for new comments')
+    watch_parser.add_argument(
+        '--posts',
+        type=int,
+        default=25,
+        help='Number of recent posts to watch (default: 25)'
+    )
+    watch_parser.add_argument(
+        '--budget',
+        type=int,
+        default=60,
+        help='Maximum API requests per minute (default: 60)'
+    )
+    watch_parser.add_argument(
+        '--hot-interval',
+        type=float,
+        default=60,
+        help='Seconds between polls of the busiest posts (default: 60)'
+    )
+    watch_parser.add_argument(
+        '--cold-interval',
+        type=float,
+        default=1800,
+        help='Seconds between polls of quiet posts (default: 1800)'
+    )
+    watch_parser.add_argument(
+        '--refresh-interval',
+        type=float,
+        default=900,
+        help='Seconds between checks for new posts (default: 900)'
+    )
+    watch_parser.add_argument(
+        '--duration',
+        type=float,
+        help='Stop after this many seconds (default: run until Ctrl+C)'
+    )
+    
+    return parser
+
+
+def main():
+    """Entry point for the application"""
+    parser = build_parser()
     args = parser.parse_args()
     
     if args.check_env:
@@ -253,6 +1047,9 @@ def main():
             print("  Please set FACEBOOK_APP_ID and FACEBOOK_APP_SECRET in .env file")
         return
     
+    if args.command:
+        sys.exit(run_command(args))
+    
     # Run the CLI
     cli = FacebookDataDownloaderCLI()
     cli.run()
@@ -0,0 +1,249 @@
+"""
+Comment analytics over export files
+Loads comments into compact column arrays and aggregates them in bulk
+"""
+
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import islice, repeat
+from operator import itemgetter
+
+from export_reader import ExportReader
+
+
+LIKE_COUNT_BINS = (0, 1, 2, 5, 10, 50, 100, 1000)
+
+# The hour in a Graph API timestamp (2025-12-25T10:30:00+0000)
+_HOUR_DIGITS = itemgetter(slice(11, 13))
+
+
+class _Codes:
+    """Dictionary encoding: maps each distinct string to a small integer"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode_all(self, values):
+        """Codes for a list of values, assigning new codes in order of first appearance"""
+        codes = self.codes
+        try:
+            return list(map(codes.__getitem__, values))
+        except KeyError:
+            pass
+        setdefault = codes.setdefault
+        # len(codes) is evaluated before setdefault inserts a new value
+        encoded = [setdefault(value, len(codes)) for value in values]
+        if len(codes) > len(self.values):
+            self.values.extend(islice(codes, len(self.values), None))
+        return encoded
+
+
+def _field(comments, key):
+    """One field of every comment (None where missing), looked up in C"""
+    return list(map(dict.get, comments, repeat(key)))
+
+
+def _comment_author(comment):
+    """Return (author_id, author) for exported or raw Graph API comments"""
+    author_id = comment.get('author_id')
+    if author_id is None:
+        sender = comment.get('from') or {}
+        return sender.get('id'), sender.get('name')
+    return author_id, comment.get('author')
+
+
+def _hour(created_time):
+    hour = (created_time or '')[11:13]
+    return int(hour) if hour.isdigit() else -1
+
+
+class CommentTable:
+    """
+    Column-backed table of comments from one or more exports
+
+    Each comment is one row spread over typed arrays: author and post ids
+    are dictionary-encoded into integer codes, hours and like counts are
+    stored as machine integers. Columns are filled a whole list of
+    comments at a time, and aggregations run over whole columns with
+    Counter/sorted (C loops) instead of walking nested post dictionaries.
+    """
+
+    def __init__(self):
+        self.authors = _Codes()
+        self.posts = _Codes()
+        self.author_names = {}
+        self.author_col = array('I')
+        self.post_col = array('I')
+        self.hour_col = array('b')
+        self.like_col = array('q')
+        self._seen_ids = set()
+
+    def __len__(self):
+        return len(self.author_col)
+
+    @classmethod
+    def from_exports(cls, filepaths, dedupe=True):
+        """Load comments from facebook_data_*.json exports, streaming one post at a time"""
+        table = cls()
+        for filepath in filepaths:
+            with ExportReader(filepath) as reader:
+                table.add_posts(reader.iter_posts(), dedupe=dedupe)
+        return table
+
+    def add_posts(self, posts, dedupe=True):
+        """
+        Append the comments (and nested replies) of posts
+
+        With dedupe=True, a comment id already loaded (from an overlapping
+        export) is skipped.
+        """
+        for post in posts:
+            post_code = self.posts.encode(post.get('id'))
+            # Top-level comments, then each level of replies
+            level = post.get('comments') or []
+            while level:
+                replies = [reply for nested in filter(None, _field(level, 'replies')) for reply in nested]
+                if dedupe:
+                    level = self._unseen(level)
+                if level:
+                    self._append(level, post_code)
+                level = replies
+
+    def _unseen(self, comments):
+        """Comments whose id has not been loaded yet, marking them as loaded"""
+        seen = self._seen_ids
+        ids = _field(comments, 'id')
+        fresh = set(ids)
+        if len(fresh) == len(ids) and None not in fresh and fresh.isdisjoint(seen):
+            seen |= fresh
+            return comments
+
+        unseen = []
+        for comment, comment_id in zip(comments, ids):
+            if comment_id is not None:
+                if comment_id in seen:
+                    continue
+                seen.add(comment_id)
+            unseen.append(comment)
+        return unseen
+
+    def _append(self, comments, post_code):
+        """Append one row per comment to every column"""
+        author_ids = _field(comments, 'author_id')
+        names = None
+        if None in author_ids:
+            # Raw Graph API comments carry the author under 'from'
+            author_ids, names = map(list, zip(*map(_comment_author, comments)))
+
+        codes = self.authors.encode_all(author_ids)
+        # Names are only looked up while some author has none yet
+        if len(self.author_names) < len(self.authors.values):
+            author_names = self.author_names
+            if names is None:
+                names = _field(comments, 'author')
+            for code, name in dict(zip(codes, names)).items():
+                if name and code not in author_names:
+                    author_names[code] = name
+
+        # Whole-list conversions first; a missing or malformed value sends
+        # the list down the per-comment path
+        stamps = _field(comments, 'created_time')
+        try:
+            hours = array('b', map(int, map(_HOUR_DIGITS, stamps)))
+        except (TypeError, ValueError):
+            hours = array('b', map(_hour, stamps))
+
+        likes = _field(comments, 'like_count')
+        try:
+            likes = array('q', likes)
+        except TypeError:
+            likes = array('q', [like or 0 for like in likes])
+
+        self.author_col.extend(array('I', codes))
+        self.post_col.extend(array('I', [post_code]) * len(comments))
+        self.hour_col.extend(hours)
+        self.like_col.extend(likes)
+
+    def _decode_counts(self, column, codes):
+        """Count a code column and map the codes back to their values"""
+        return {codes.values[code]: count for code, count in Counter(column).most_common()}
+
+    def comments_per_author(self):
+        """Comment count per author_id, most active first"""
+        return self._decode_counts(self.author_col, self.authors)
+
+    def comments_per_post(self):
+        """Comment count per post id, busiest first"""
+        return self._decode_counts(self.post_col, self.posts)
+
+    def comments_per_hour(self):
+        """List of 24 comment counts by hour of day (UTC)"""
+        counts = Counter(self.hour_col)
+        return [counts.get(hour, 0) for hour in range(24)]
+
+    def top_commenters(self, n=10):
+        """The n most active commenters as (author_id, name, count) tuples"""
+        return [
+            (self.authors.values[code], self.author_names.get(code), count)
+            for code, count in Counter(self.author_col).most_common(n)
+        ]
+
+    def like_count_distribution(self, bins=LIKE_COUNT_BINS):
+        """
+        Histogram of like counts
+
+        Returns:
+            Dictionary mapping a bin label ('0', '1', '2-4', ..., '1000+')
+            to the number of comments in it
+        """
+        labels = []
+        for i, low in enumerate(bins):
+            high = bins[i + 1] - 1 if i + 1 < len(bins) else None
+            if high is None:
+                labels.append(f'{low}+')
+            elif high == low:
+                labels.append(str(low))
+            else:
+                labels.append(f'{low}-{high}')
+
+        value_counts = Counter(self.like_col)
+        histogram = dict.fromkeys(labels, 0)
+        for value, count in value_counts.items():
+            index = max(bisect_right(bins, value) - 1, 0)
+            histogram[labels[index]] += count
+        return histogram
+
+    def like_count_percentiles(self, percentiles=(50, 90, 99)):
+        """Nearest-rank percentiles of the like counts"""
+        if not self.like_col:
+            return {p: None for p in percentiles}
+        ordered = sorted(self.like_col)
+        last = len(ordered) - 1
+        return {p: ordered[min(last, max(0, round(p / 100 * last)))] for p in percentiles}
+
+    def summary(self, top=10):
+        """All aggregations in one JSON-serializable dictionary"""
+        return {
+            'total_comments': len(self),
+            'total_posts': len(self.posts.values),
+            'total_authors': len(self.authors.values),
+            'top_commenters': [
+                {'author_id': author_id, 'author': name, 'comments': count}
+                for author_id, name, count in self.top_commenters(top)
+            ],
+            'comments_per_hour': self.comments_per_hour(),
+            'like_count_distribution': self.like_count_distribution(),
+            'like_count_percentiles': {
+                str(p): value for p, value in self.like_count_percentiles().items()
+            },
+        }
@@ -0,0 +1,249 @@
+"""
+Alternative comment export formats
+JSON Lines for streaming/splitting and a compact columnar file for analysis
+"""
+
+import json
+import os
+import struct
+import zlib
+from datetime import datetime
+
+from models import FlatComment, Post, iter_flat
+from reply_threads import walk_thread
+
+
+FORMATS = ('json', 'jsonl', 'columnar')
+
+FILE_EXTENSIONS = {
+    'json': '.json',
+    'jsonl': '.jsonl',
+    'columnar': '.fbcol',
+}
+
+COLUMNS = (
+    'comment_id',
+    'comment_text',
+    'created_time',
+    'author',
+    'author_id',
+    'like_count',
+    'post_id',
+    'post_text',
+    'parent_id',
+)
+
+COLUMNAR_MAGIC = b'FBCOL1\n'
+
+
+def flatten_comments(posts):
+    """
+    Yield one flat comment record per comment, linked to its source post
+
+    Accepts posts as exported (author/author_id) or as returned by the
+    Graph API (from.name/from.id). Replies follow their parent comment and
+    carry its id in 'parent_id'.
+    """
+    for post in posts:
+        source_post = {
+            'post_id': post.get('id'),
+            'post_text': post.get('message', ''),
+        }
+        for comment in walk_thread(post.get('comments') or []):
+            sender = comment.get('from') or {}
+            record = {
+                'comment_id': comment.get('id'),
+                'comment_text': comment.get('message', ''),
+                'created_time': comment.get('created_time'),
+                'author': comment.get('author', sender.get('name')),
+                'author_id': comment.get('author_id', sender.get('id')),
+                'like_count': comment.get('like_count', 0),
+                'source_post': source_post,
+            }
+            if comment.get('parent_id') is not None:
+                record['parent_id'] = comment['parent_id']
+            yield record
+
+
+def _row(comment):
+    """Project a flat comment record onto the columnar layout"""
+    if isinstance(comment, FlatComment):
+        return comment.row()
+    source_post = comment.get('source_post') or {}
+    return (
+        comment.get('comment_id'),
+        comment.get('comment_text'),
+        comment.get('created_time'),
+        comment.get('author'),
+        comment.get('author_id'),
+        comment.get('like_count', 0),
+        source_post.get('post_id'),
+        source_post.get('post_text'),
+        comment.get('parent_id'),
+    )
+
+
+def write_json(comments, filepath):
+    """
+    Write comments as one JSON document with a metadata block
+
+    Returns:
+        Number of comments written
+    """
+    records = [c.to_dict() if isinstance(c, FlatComment) else c for c in comments]
+    data = {
+        'metadata': {
+            'exported_at': datetime.now().isoformat(),
+            'total_comments': len(records),
+            'platform': 'facebook',
+        },
+        'comments': records,
+    }
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return len(records)
+
+
+def write_jsonl(comments, filepath):
+    """
+    Write comments as newline-delimited JSON, one comment per line
+
+    Returns:
+        Number of comments written
+    """
+    count = 0
+    with open(filepath, 'w', encoding='utf-8') as f:
+        for comment in comments:
+            if isinstance(comment, FlatComment):
+                comment = comment.to_dict()
+            f.write(json.dumps(comment, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def iter_jsonl(filepath):
+    """Lazily yield comments from a JSON Lines file"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_columnar(comments, filepath, compress=True):
+    """
+    Write comments as a column-oriented file
+
+    Layout: magic line, 4-byte header length, JSON header listing each
+    column's byte range, then one (optionally zlib-compressed) JSON array
+    per column. Readers can seek straight to the columns they need.
+
+    Returns:
+        Number of comments written
+    """
+    columns = [[] for _ in COLUMNS]
+    for comment in comments:
+        for column, value in zip(columns, _row(comment)):
+            column.append(value)
+
+    blocks = []
+    for values in columns:
+        block = json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        blocks.append(zlib.compress(block, 6) if compress else block)
+
+    offset = 0
+    column_index = []
+    for name, block in zip(COLUMNS, blocks):
+        column_index.append({'name': name, 'offset': offset, 'length': len(block)})
+        offset += len(block)
+
+    row_count = len(columns[0])
+    header = json.dumps({
+        'rows': row_count,
+        'compression': 'zlib' if compress else None,
+        'columns': column_index,
+    }).encode('utf-8')
+
+    with open(filepath, 'wb') as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+
+    return row_count
+
+
+def read_columnar(filepath, columns=None):
+    """
+    Read selected columns from a columnar comment file
+
+    Args:
+        filepath: Path to a file written by write_columnar
+        columns: Column names to load (default: all)
+
+    Returns:
+        Dictionary mapping column name to list of values
+    """
+    with open(filepath, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{filepath} is not a columnar comment file")
+
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length))
+        data_start = f.tell()
+
+        wanted = set(columns) if columns else None
+        result = {}
+        for column in header['columns']:
+            if wanted is not None and column['name'] not in wanted:
+                continue
+            f.seek(data_start + column['offset'])
+            block = f.read(column['length'])
+            if header['compression'] == 'zlib':
+                block = zlib.decompress(block)
+            result[column['name']] = json.loads(block)
+
+    if wanted is not None:
+        missing = wanted - set(result)
+        if missing:
+            raise KeyError(f"Unknown columns: {', '.join(sorted(missing))}")
+
+    return result
+
+
+def export_comments(posts, fmt, output_dir='data', filename=None, compress=True):
+    """
+    Export a flat comment list in JSON, JSON Lines or columnar format
+
+    Args:
+        posts: List of posts with nested comments (dictionaries or Post records)
+        fmt: 'json', 'jsonl' or 'columnar'
+        output_dir: Directory to write into
+        filename: Output filename (default: timestamped)
+        compress: Compress columnar blocks with zlib
+
+    Returns:
+        Path to the written file
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported comment format: {fmt}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    if not filename:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"facebook_comments_{timestamp}{FILE_EXTENSIONS[fmt]}"
+    filepath = os.path.join(output_dir, filename)
+
+    if posts and isinstance(posts[0], Post):
+        comments = iter_flat(posts)
+    else:
+        comments = flatten_comments(posts)
+    if fmt == 'json':
+        write_json(comments, filepath)
+    elif fmt == 'jsonl':
+        write_jsonl(comments, filepath)
+    else:
+        write_columnar(comments, filepath, compress=compress)
+
+    return filepath
@@ -0,0 +1,186 @@
+"""
+Offensive comment scanner
+Matches every comment against a term/regex lexicon in a single regex pass
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from comment_formats import flatten_comments
+from models import FlatComment
+
+
+def load_lexicon(filepath):
+    """
+    Load a lexicon file
+
+    One entry per line. Plain lines are terms matched as whole words,
+    lines starting with 're:' are regular expressions, and lines starting
+    with '#' are comments. Matching is case-insensitive.
+
+    Returns:
+        Tuple of (terms, patterns)
+
+    Raises:
+        ValueError: If a 're:' line has no pattern (it would match everything)
+    """
+    terms = []
+    patterns = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            entry = line.strip()
+            if not entry or entry.startswith('#'):
+                continue
+            if entry.startswith('re:'):
+                pattern = entry[3:].strip()
+                if not pattern:
+                    raise ValueError(f"{filepath}:{line_number}: empty 're:' pattern")
+                patterns.append(pattern)
+            else:
+                terms.append(entry)
+    return terms, patterns
+
+
+def _trie_pattern(terms):
+    """
+    Build a regex from a trie of the terms
+
+    Shared prefixes are merged ('idiot|idiots|idiocy' becomes
+    'idio(?:t(?:s)?|cy)'), so the regex engine walks each position once
+    like an Aho-Corasick automaton instead of retrying every alternative.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class CommentScanner:
+    """Flags comments that match any term or pattern of a lexicon"""
+
+    def __init__(self, terms=(), patterns=()):
+        self.terms = sorted({term.lower() for term in terms if term.strip()})
+        self.patterns = list(patterns)
+        if not self.terms and not self.patterns:
+            raise ValueError("Lexicon is empty")
+
+        # Lookarounds rather than \b, so terms that start or end with a
+        # symbol ('@ss') are still matched as whole words
+        alternatives = []
+        if self.terms:
+            alternatives.append(r'(?<!\w)' + _trie_pattern(self.terms) + r'(?!\w)')
+        alternatives.extend(f'(?:{pattern})' for pattern in self.patterns)
+        self.regex = re.compile('|'.join(alternatives), re.IGNORECASE)
+
+    @classmethod
+    def from_file(cls, filepath):
+        """Create a scanner from a lexicon file"""
+        terms, patterns = load_lexicon(filepath)
+        return cls(terms, patterns)
+
+    def match(self, text):
+        """Get the distinct lexicon hits in a piece of text, in order"""
+        if not text:
+            return []
+        return list(dict.fromkeys(m.group(0).lower() for m in self.regex.finditer(text)))
+
+    def scan(self, comments, workers=1, chunk_size=20000):
+        """
+        Scan flat comment records (as produced by flatten_comments or iter_flat)
+
+        Args:
+            comments: Iterable of flat comment dictionaries or FlatComment views
+            workers: Number of processes; 1 scans in this process
+            chunk_size: Comments sent to a worker at a time
+
+        Returns:
+            List of flagged comments, each with a 'matches' list
+        """
+        comments = list(comments)
+        texts = [
+            comment.text if isinstance(comment, FlatComment) else comment.get('comment_text') or ''
+            for comment in comments
+        ]
+
+        if workers > 1 and len(texts) > chunk_size:
+            chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.terms, self.patterns),
+            ) as pool:
+                hits = [h for chunk_hits in pool.map(_scan_chunk, chunks) for h in chunk_hits]
+        else:
+            hits = [self.match(text) for text in texts]
+
+        # Views are only turned into dictionaries once flagged
+        return [
+            dict(comment.to_dict() if isinstance(comment, FlatComment) else comment, matches=matches)
+            for comment, matches in zip(comments, hits) if matches
+        ]
+
+    def scan_posts(self, posts, workers=1):
+        """Scan every comment of posts with nested comments"""
+        return self.scan(flatten_comments(posts), workers=workers)
+
+
+_worker_scanner = None
+
+
+def _init_worker(terms, patterns):
+    """Compile the lexicon once per worker process"""
+    global _worker_scanner
+    _worker_scanner = CommentScanner(terms, patterns)
+
+
+def _scan_chunk(texts):
+    """Scan a chunk of comment texts inside a worker process"""
+    return [_worker_scanner.match(text) for text in texts]
+
+
+def export_flagged(flagged, total_scanned, output_dir='data', filename=None, lexicon=None):
+    """
+    Export flagged comments (with their source posts) to JSON
+
+    Returns:
+        Path to the written file
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if not filename:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"facebook_flagged_{timestamp}.json"
+    filepath = os.path.join(output_dir, filename)
+
+    data = {
+        'metadata': {
+            'exported_at': datetime.now().isoformat(),
+            'total_scanned': total_scanned,
+            'total_flagged': len(flagged),
+            'lexicon': lexicon,
+            'platform': 'facebook',
+        },
+        'comments': flagged,
+    }
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+    return filepath
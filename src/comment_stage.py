@@ -0,0 +1,124 @@
+"""
+Concurrent comment stage for downloads
+Fetches the posts first, then the comments of many posts at a time
+"""
+
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from reply_threads import thread_local_fetch
+
+
+def limit_requests(fetcher, budget, sleep=time.sleep):
+    """
+    Make a fetcher's _make_request wait for room in a shared budget
+
+    The wrapper is set on the instance, like ResponseCache.wrap. Wrapping
+    every worker's fetcher with the same budget caps the requests of the
+    whole download, however many threads make them.
+
+    Args:
+        fetcher: Object with a _make_request method
+        budget: comment_watcher.RequestBudget shared by all fetchers
+    """
+    make_request = fetcher._make_request
+
+    @functools.wraps(make_request)
+    def limited(*args, **kwargs):
+        budget.acquire(sleep)
+        return make_request(*args, **kwargs)
+
+    fetcher._make_request = limited
+    return fetcher
+
+
+def fetch_posts_only(fetcher, limit):
+    """
+    Fetch posts without requesting their comments
+
+    get_posts asks self.get_comments for each post's comments. For this
+    call, get_comments is replaced on the instance by one that returns no
+    comments, so only the posts pages are requested.
+
+    Returns:
+        Tuple of (posts, whether get_posts went through get_comments)
+    """
+    skipped = []
+    previous = fetcher.__dict__.get('get_comments')
+
+    def no_comments(post_id, *args, **kwargs):
+        skipped.append(post_id)
+        return []
+
+    fetcher.get_comments = no_comments
+    try:
+        posts = fetcher.get_posts(limit=limit)
+    finally:
+        if previous is None:
+            del fetcher.get_comments
+        else:
+            fetcher.get_comments = previous
+    return posts, bool(skipped)
+
+
+def fetch_comments(posts, fetch, workers=8):
+    """
+    Fill in the comments of posts concurrently, in place
+
+    A post whose comments could not be fetched gets an empty list and is
+    counted as failed.
+
+    Args:
+        posts: Post dictionaries
+        fetch: Callable taking a post id and returning its comments
+        workers: Posts fetched at the same time
+
+    Returns:
+        Stats dictionary: {'posts', 'comments', 'failed'}
+    """
+    stats = {'posts': len(posts), 'comments': 0, 'failed': 0}
+
+    def load(post):
+        try:
+            return fetch(post['id']), False
+        except Exception:
+            return [], True
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for post, (comments, failed) in zip(posts, pool.map(load, posts)):
+            post['comments'] = comments or []
+            stats['comments'] += len(post['comments'])
+            stats['failed'] += failed
+
+    return stats
+
+
+def download_posts(fetcher, make_fetcher, limit, workers=8):
+    """
+    Posts with nested comments, like fetcher.get_posts, fetched concurrently
+
+    The posts pages come from 'fetcher'; the comments of 'workers' posts
+    at a time come from one fetcher per worker thread (see
+    reply_threads.thread_local_fetch). The result has the same shape as
+    get_posts, so it can go straight to DataExporter. A fetcher's own delay
+    between requests still applies per thread, but the threads wait in
+    parallel.
+
+    Args:
+        fetcher: Fetcher for the posts pages
+        make_fetcher: Callable returning a new fetcher (cache/budget wrapped)
+        limit: Number of posts
+        workers: Concurrent comment fetches
+
+    Returns:
+        Tuple of (posts, stats dictionary as returned by fetch_comments)
+    """
+    posts, skipped = fetch_posts_only(fetcher, limit)
+    if not skipped:
+        # get_posts fetched the comments itself; they are already in place
+        comments = sum(len(post.get('comments') or []) for post in posts)
+        return posts, {'posts': len(posts), 'comments': comments, 'failed': 0}
+
+    stats = fetch_comments(posts, thread_local_fetch(make_fetcher), workers)
+    return posts, stats
@@ -0,0 +1,358 @@
+"""
+Watch mode for new comments
+Polls recent posts on a hot/cold schedule within a request budget and appends new comments to a rolling file
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from comment_formats import flatten_comments
+
+
+def _parse_time(value):
+    """Graph API timestamp (2025-12-25T10:30:00+0000) to epoch seconds, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S%z').timestamp()
+    except ValueError:
+        return None
+
+
+class RequestBudget:
+    """
+    Sliding window: at most 'per_minute' requests in any 60 seconds
+
+    Every request sent is recorded with its time. Work that needs more
+    requests than the window has left waits until enough of the recorded
+    ones are a minute old.
+    """
+
+    def __init__(self, per_minute, clock=time.time, window=60.0):
+        self.capacity = max(1, per_minute)
+        self.window = window
+        self.clock = clock
+        self.sent = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self.sent and self.sent[0] <= now - self.window:
+            self.sent.popleft()
+
+    def charge(self, cost=1):
+        """Record requests as sent now"""
+        now = self.clock()
+        self.sent.extend([now] * cost)
+        self._expire(now)
+
+    def wait_time(self, cost=1):
+        """Seconds until 'cost' requests fit in the window"""
+        now = self.clock()
+        self._expire(now)
+        excess = len(self.sent) + min(cost, self.capacity) - self.capacity
+        if excess <= 0:
+            return 0.0
+        return max(0.0, self.sent[excess - 1] + self.window - now)
+
+    def acquire(self, sleep=time.sleep):
+        """Wait until one more request fits in the window and record it (thread-safe)"""
+        while True:
+            with self._lock:
+                wait = self.wait_time()
+                if wait == 0:
+                    self.charge()
+                    return
+            sleep(wait)
+
+
+class RollingWriter:
+    """Appends records to one JSON Lines file per day"""
+
+    def __init__(self, output_dir='data', prefix='facebook_watch', clock=time.time):
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.clock = clock
+        self.path = None
+        self._file = None
+
+    def _current_path(self):
+        day = datetime.fromtimestamp(self.clock()).strftime('%Y%m%d')
+        return os.path.join(self.output_dir, f"{self.prefix}_{day}.jsonl")
+
+    def write(self, records):
+        """Append records, rolling to a new file when the day changes"""
+        path = self._current_path()
+        if path != self.path:
+            self.close()
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._file = open(path, 'a', encoding='utf-8')
+            self.path = path
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False))
+            self._file.write('\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class _PostState:
+    """Scheduling state for one watched post"""
+
+    __slots__ = ('post', 'created', 'seen', 'velocity', 'last_poll', 'next_due', 'polls', 'pages')
+
+    def __init__(self, post, now):
+        self.post = {'id': post.get('id'), 'message': post.get('message', '')}
+        self.created = _parse_time(post.get('created_time'))
+        self.seen = set()
+        self.velocity = 0.0
+        self.last_poll = now
+        self.next_due = now
+        self.polls = 0
+        self.pages = 1
+
+
+class CommentWatcher:
+    """
+    Long-running poller for new comments on recent posts
+
+    Every watched post has a comment velocity (new comments per minute,
+    exponentially smoothed over its polls). Its next poll is scheduled so
+    that it is expected to bring about 'target_per_poll' new comments,
+    clamped between hot_interval and cold_interval; posts younger than
+    hot_age are checked at least every 4 hot intervals. Every request is
+    paid for from a per-minute budget. When the budget runs short, the
+    hottest due post is polled first and cold posts wait.
+
+    Requests are counted by wrapping the fetcher's _make_request on the
+    instance, so paginated pages and failed calls are paid for too. A poll
+    only starts once the window has room for as many requests as the
+    post's last poll took (a refresh likewise); a post with more comment
+    pages than the whole budget is polled with the full window. A fetcher
+    without _make_request is charged one request per poll and
+    posts_limit + 1 per refresh.
+    """
+
+    def __init__(self, fetcher, output_dir='data', posts_limit=25, budget_per_minute=60,
+                 hot_interval=60, cold_interval=1800, hot_age=6 * 3600, target_per_poll=5,
+                 refresh_interval=900, clock=time.time, sleep=time.sleep, on_comments=None):
+        if budget_per_minute < posts_limit + 1:
+            raise ValueError(f"A budget of {budget_per_minute} requests/min cannot cover a refresh "
+                             f"of {posts_limit} posts ({posts_limit + 1} requests)")
+        self._requests = 0
+        self._requests_lock = threading.Lock()
+        self._counting = False
+        self.budget = RequestBudget(budget_per_minute, clock=clock)
+        self.fetcher = fetcher
+        self.posts_limit = posts_limit
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.hot_age = hot_age
+        self.target_per_poll = target_per_poll
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.on_comments = on_comments
+        self.refresh_cost = posts_limit + 1
+        self.writer = RollingWriter(output_dir, clock=clock)
+        self.posts = {}
+        self.next_refresh = clock()
+        self.stopped = False
+        self.stats = {'polls': 0, 'refreshes': 0, 'requests': 0, 'new_comments': 0, 'errors': 0}
+
+    @property
+    def fetcher(self):
+        return self._fetcher
+
+    @fetcher.setter
+    def fetcher(self, fetcher):
+        """Use a fetcher, counting the API requests it makes"""
+        self._fetcher = fetcher
+        make_request = getattr(fetcher, '_make_request', None)
+        self._counting = callable(make_request)
+        if not self._counting:
+            return
+
+        def counted(*args, **kwargs):
+            with self._requests_lock:
+                self._requests += 1
+                self.budget.charge()
+            return make_request(*args, **kwargs)
+
+        fetcher._make_request = counted
+
+    def _metered(self, estimate, method, *args, **kwargs):
+        """
+        Call a fetcher method and count its requests
+
+        Counted requests are charged to the budget as they are sent;
+        without counting, 'estimate' is charged afterwards.
+
+        Returns:
+            Tuple of (result, requests made)
+        """
+        before = self._requests
+        try:
+            result = method(*args, **kwargs)
+        finally:
+            if self._counting:
+                made = self._requests - before
+            else:
+                made = estimate
+                self.budget.charge(estimate)
+            self.stats['requests'] += made
+        return result, made
+
+    def interval(self, state, now):
+        """Seconds until a post should be polled again"""
+        if state.velocity > 0:
+            interval = self.target_per_poll / state.velocity * 60
+        else:
+            interval = self.cold_interval
+        interval = max(self.hot_interval, min(self.cold_interval, interval))
+        if state.created is not None and now - state.created < self.hot_age:
+            interval = min(interval, self.hot_interval * 4)
+        return interval
+
+    def _emit(self, state, comments):
+        """Append new comments (flat layout, with the time they were seen)"""
+        if not comments:
+            return
+        seen_at = datetime.fromtimestamp(self.clock(), timezone.utc).isoformat()
+        post = dict(state.post, comments=comments)
+        records = [dict(record, seen_at=seen_at) for record in flatten_comments([post])]
+        self.writer.write(records)
+        self.stats['new_comments'] += len(records)
+        if self.on_comments:
+            self.on_comments(state.post['id'], records)
+
+    def _new_comments(self, state, comments):
+        """Comments not seen before on this post"""
+        new = [c for c in comments or [] if c.get('id') not in state.seen]
+        state.seen.update(c.get('id') for c in new)
+        return new
+
+    def _recent_velocity(self, comments, now, window=3600):
+        """Comments per minute over the last hour, from their timestamps"""
+        recent = 0
+        for comment in comments or []:
+            created = _parse_time(comment.get('created_time'))
+            if created is not None and now - created <= window:
+                recent += 1
+        return recent / (window / 60)
+
+    def refresh_posts(self, initial=False):
+        """
+        Discover recent posts
+
+        get_posts fetches the comments of every post too, so this costs at
+        least one request per post plus the posts page. Comments already
+        there when the watcher starts are taken as seen, not written.
+        """
+        now = self.clock()
+        posts, made = self._metered(self.posts_limit + 1, self.fetcher.get_posts, limit=self.posts_limit)
+        self.stats['refreshes'] += 1
+        self.refresh_cost = max(made, 1)
+
+        # Comment pages per post are not known separately; start new posts
+        # at the average until their own first poll
+        pages = max(1, math.ceil((made - 1) / len(posts))) if posts else 1
+        for post in posts:
+            state = self.posts.get(post.get('id'))
+            if state is None:
+                state = self.posts[post.get('id')] = _PostState(post, now)
+                state.pages = pages
+                state.velocity = self._recent_velocity(post.get('comments'), now)
+                state.next_due = now + self.interval(state, now)
+            new = self._new_comments(state, post.get('comments'))
+            if not initial:
+                self._emit(state, new)
+
+        # Stop watching posts that dropped out of the recent window
+        current = {post.get('id') for post in posts}
+        for post_id in list(self.posts):
+            if post_id not in current:
+                del self.posts[post_id]
+
+        self.next_refresh = now + self.refresh_interval
+
+    def poll(self, state):
+        """Fetch one post's comments and write the new ones"""
+        now = self.clock()
+        try:
+            comments, made = self._metered(1, self.fetcher.get_comments, state.post['id'])
+        except Exception:
+            self.stats['errors'] += 1
+            state.next_due = now + self.interval(state, now)
+            return []
+        self.stats['polls'] += 1
+        state.pages = max(made, 1)
+
+        new = self._new_comments(state, comments)
+        elapsed_min = max(now - state.last_poll, 1) / 60
+        rate = len(new) / elapsed_min
+        state.velocity = rate if not state.polls else 0.5 * state.velocity + 0.5 * rate
+        state.last_poll = now
+        state.polls += 1
+        state.next_due = now + self.interval(state, now)
+
+        self._emit(state, new)
+        return new
+
+    def step(self):
+        """
+        Do the next unit of work, if any is due and affordable
+
+        Returns:
+            Seconds to sleep before the next step
+        """
+        now = self.clock()
+
+        # Work starts once the window has room for as many requests as it
+        # took last time
+        if now >= self.next_refresh:
+            wait = self.budget.wait_time(self.refresh_cost)
+            if wait == 0:
+                self.refresh_posts(initial=not self.stats['refreshes'])
+            return wait
+
+        due = [state for state in self.posts.values() if state.next_due <= now]
+        if not due:
+            next_due = min([s.next_due for s in self.posts.values()] + [self.next_refresh])
+            return max(0.0, next_due - now)
+
+        # Hottest first; among equals, the longest overdue
+        state = max(due, key=lambda s: (s.velocity, now - s.next_due))
+        wait = self.budget.wait_time(state.pages)
+        if wait > 0:
+            return wait
+        self.poll(state)
+        return 0
+
+    def run(self, duration=None):
+        """Poll until stop() is called or 'duration' seconds have passed"""
+        end = self.clock() + duration if duration else None
+        try:
+            while not self.stopped:
+                wait = self.step()
+                if end is not None:
+                    remaining = end - self.clock()
+                    if remaining <= 0:
+                        break
+                    wait = min(wait, remaining)
+                if wait > 0:
+                    self.sleep(wait)
+        finally:
+            self.writer.close()
+        return self.stats
+
+    def stop(self):
+        """Ask run() to return after the current step"""
+        self.stopped = True
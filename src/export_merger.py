@@ -0,0 +1,227 @@
+"""
+Cross-export deduplication and merge
+Compacts overlapping facebook_data_*.json exports into one dataset
+"""
+
+import json
+import os
+from datetime import datetime
+
+from export_reader import ExportReader
+from reply_threads import walk_with_parents
+
+
+def _export_time(filepath, metadata):
+    """Sort key for an export: its exported_at stamp, else the file mtime"""
+    exported_at = metadata.get('exported_at')
+    if exported_at:
+        return exported_at
+    return datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
+
+
+def latest_export(json_files):
+    """
+    The most recently exported of json_files, by metadata exported_at
+    (file mtime when missing)
+
+    Returns:
+        File path, or None if no file could be read
+    """
+    latest = None
+    for filepath in json_files:
+        try:
+            with ExportReader(filepath) as reader:
+                stamp = _export_time(filepath, reader.read_metadata())
+        except (OSError, ValueError):
+            continue
+        if latest is None or stamp >= latest[0]:
+            latest = (stamp, filepath)
+    return latest[1] if latest else None
+
+
+class ExportMerger:
+    """
+    Builds an id index over many exports and keeps the newest copy of each
+    post and comment
+
+    Exports are applied oldest first. A post or comment seen again replaces
+    the stored copy; if its message changed, the old text is kept in
+    'previous_messages'. A comment that was in an earlier copy of a post but
+    is missing from a newer copy of the same post is kept and marked
+    'deleted'; it is not counted in total_comments.
+
+    Replies are indexed like comments, with their parent in 'parents', and
+    nested under it again on output. A reply only counts as deleted when
+    the newer copy has replies at all: an export downloaded without
+    --replies says nothing about them.
+    """
+
+    def __init__(self):
+        self.posts = {}
+        self.comments = {}
+        self.parents = {}
+        self.sources = []
+        self.user = None
+
+    def add_export(self, filepath):
+        """Apply one export file on top of what has been merged so far"""
+        with ExportReader(filepath) as reader:
+            self.user = reader.read_user() or self.user
+            # attach_replies records total_replies in exports it expanded
+            with_replies = 'total_replies' in reader.read_metadata() or None
+            for post in reader.iter_posts():
+                self.add_post(post, filepath, with_replies)
+        self.sources.append(filepath)
+
+    def _update(self, stored, incoming):
+        """Replace a stored record with a newer copy, keeping edit history"""
+        history = stored.get('previous_messages', [])
+        if incoming.get('message') != stored.get('message'):
+            history = history + [stored.get('message')]
+        if history:
+            incoming['previous_messages'] = history
+        return incoming
+
+    def add_post(self, post, source=None, with_replies=None):
+        """
+        Merge one post (with nested comments and replies) into the index
+
+        Args:
+            post: Post with nested comments
+            source: Export file the post came from
+            with_replies: Whether replies were downloaded for this copy
+                (default: whether any comment of the post has replies)
+        """
+        post = dict(post)
+        comments = post.pop('comments', None) or []
+        post_id = post.get('id')
+
+        stored = self.posts.get(post_id)
+        if stored is None:
+            post['comment_ids'] = []
+            self.posts[post_id] = post
+        else:
+            post['comment_ids'] = stored['comment_ids']
+            self.posts[post_id] = self._update(stored, post)
+        entry = self.posts[post_id]
+
+        present = set()
+        for comment, parent_id in walk_with_parents(comments):
+            comment_id = comment.get('id')
+            present.add(comment_id)
+            if parent_id is not None:
+                self.parents[comment_id] = parent_id
+            record = {k: v for k, v in comment.items() if k != 'replies'}
+            stored_comment = self.comments.get(comment_id)
+            if stored_comment is None:
+                self.comments[comment_id] = record
+                entry['comment_ids'].append(comment_id)
+            else:
+                self.comments[comment_id] = self._update(stored_comment, record)
+
+        if with_replies is None:
+            with_replies = len(present) > len(comments)
+        for comment_id in entry['comment_ids']:
+            if comment_id in self.parents and not with_replies:
+                continue
+            if comment_id not in present:
+                comment = self.comments[comment_id]
+                if not comment.get('deleted'):
+                    comment['deleted'] = True
+                    comment['deleted_detected_in'] = source
+
+    def merged_posts(self):
+        """The compacted posts with nested comments and replies, newest first"""
+        posts = []
+        for post in self.posts.values():
+            post = dict(post)
+            post['comments'] = []
+            nested = {}
+            for comment_id in post.pop('comment_ids'):
+                comment = nested[comment_id] = dict(self.comments[comment_id])
+                parent = nested.get(self.parents.get(comment_id))
+                if parent is None:
+                    post['comments'].append(comment)
+                else:
+                    parent.setdefault('replies', []).append(comment)
+            posts.append(post)
+        posts.sort(key=lambda p: p.get('created_time') or '', reverse=True)
+        return posts
+
+    def write(self, output_dir='data', filename=None):
+        """
+        Write the compacted dataset as a regular export file
+
+        Returns:
+            Path to the written file
+        """
+        posts = self.merged_posts()
+        deleted = sum(1 for c in self.comments.values() if c.get('deleted'))
+        replies = sum(1 for c in self.parents if not self.comments[c].get('deleted'))
+        edits = sum(
+            len(record.get('previous_messages', []))
+            for record in list(self.posts.values()) + list(self.comments.values())
+        )
+
+        os.makedirs(output_dir, exist_ok=True)
+        if not filename:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"facebook_data_merged_{timestamp}.json"
+        filepath = os.path.join(output_dir, filename)
+
+        metadata = {
+            'exported_at': datetime.now().isoformat(),
+            'total_posts': len(posts),
+            'total_comments': len(self.comments) - deleted,
+            'platform': 'facebook',
+            'merged_from': self.sources,
+            'total_edits': edits,
+            'total_deleted_comments': deleted,
+        }
+        if self.parents:
+            metadata['total_replies'] = replies
+        data = {
+            'metadata': metadata,
+            'user': self.user or {},
+            'posts': posts,
+        }
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        return filepath
+
+
+def merge_exports(json_files, output_dir='data', remove_sources=False):
+    """
+    Merge export files into one compacted export
+
+    Args:
+        json_files: Export files to merge (any order)
+        output_dir: Directory for the merged file
+        remove_sources: Delete the merged inputs (and their .idx sidecars)
+
+    Returns:
+        Tuple of (merged file path, merger)
+    """
+    ordered = []
+    for filepath in json_files:
+        with ExportReader(filepath) as reader:
+            ordered.append((_export_time(filepath, reader.read_metadata()), filepath))
+    ordered.sort()
+
+    merger = ExportMerger()
+    for _, filepath in ordered:
+        merger.add_export(filepath)
+
+    merged_file = merger.write(output_dir)
+
+    if remove_sources:
+        for _, filepath in ordered:
+            if os.path.abspath(filepath) == os.path.abspath(merged_file):
+                continue
+            os.remove(filepath)
+            if os.path.exists(filepath + '.idx'):
+                os.remove(filepath + '.idx')
+
+    return merged_file, merger
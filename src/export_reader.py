@@ -0,0 +1,243 @@
+"""
+Lazy reader for export files
+Reads metadata and iterates posts from a memory-mapped file without loading it whole
+"""
+
+import codecs
+import json
+import mmap
+import os
+
+
+WHITESPACE = ' \t\n\r'
+
+
+class _Cursor:
+    """
+    Incremental JSON cursor over a memory-mapped file
+
+    Text is decoded from the map in chunks as the cursor advances, and each
+    value is parsed with the C json decoder, so only the value currently
+    being read is held in memory. Byte offsets are tracked alongside the
+    text position so values can be located again later.
+    """
+
+    def __init__(self, mm, byte_offset=0, chunk_size=1 << 20):
+        self.mm = mm
+        self.size = len(mm)
+        self.chunk_size = chunk_size
+        self.read_pos = byte_offset
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.i = 0
+        self.byte_pos = byte_offset
+
+    def _fill(self):
+        """Decode the next chunk of the file into the buffer"""
+        if self.read_pos >= self.size:
+            return False
+
+        # Drop text that has already been consumed
+        if self.i > len(self.buf) // 2:
+            self.buf = self.buf[self.i:]
+            self.i = 0
+
+        end = min(self.read_pos + self.chunk_size, self.size)
+        self.buf += self.decoder.decode(self.mm[self.read_pos:end], final=end >= self.size)
+        self.read_pos = end
+        return True
+
+    def _advance(self, new_i):
+        """Move the cursor forward, keeping the byte position in step"""
+        self.byte_pos += len(self.buf[self.i:new_i].encode('utf-8'))
+        self.i = new_i
+
+    def peek(self, skip=WHITESPACE):
+        """Skip the given characters and return the next one ('' at EOF)"""
+        while True:
+            while self.i < len(self.buf) and self.buf[self.i] in skip:
+                self._advance(self.i + 1)
+            if self.i < len(self.buf):
+                return self.buf[self.i]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        """Consume one expected structural character"""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at byte {self.byte_pos}, found {found!r}")
+        self._advance(self.i + 1)
+
+    def value(self):
+        """
+        Parse the JSON value at the cursor
+
+        Returns:
+            Tuple of (value, byte offset, byte length)
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.i)
+                # A number may continue in the next chunk
+                if end < len(self.buf) or self.read_pos >= self.size:
+                    break
+            except json.JSONDecodeError:
+                if self.read_pos >= self.size:
+                    raise
+            self.chunk_size *= 2
+            self._fill()
+
+        start = self.byte_pos
+        self._advance(end)
+        return value, start, self.byte_pos - start
+
+    def keys(self):
+        """Yield the keys of the object at the cursor, leaving it on each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self._advance(self.i + 1)
+            return
+        while True:
+            key, _, _ = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self._advance(self.i + 1)
+                continue
+            self.expect('}')
+            return
+
+    def elements(self):
+        """Yield (value, byte offset, byte length) for each element of the array at the cursor"""
+        self.expect('[')
+        if self.peek() == ']':
+            self._advance(self.i + 1)
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self._advance(self.i + 1)
+                continue
+            self.expect(']')
+            return
+
+
+class ExportReader:
+    """Read a facebook_data_*.json export lazily through a memory map"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.index_file = filepath + '.idx'
+        self._file = open(filepath, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mm = b''
+        self._index = None
+
+    def close(self):
+        """Release the memory map and file handle"""
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_metadata(self):
+        """
+        Read the metadata block
+
+        Exports write metadata before posts, so this stops long before the
+        posts array. If metadata comes last, the posts are skipped one at a
+        time to reach it, so a 'metadata' key nested inside a post or
+        another block is never taken for the top-level one.
+        """
+        cursor = _Cursor(self._mm)
+        for key in cursor.keys():
+            if key == 'metadata':
+                return cursor.value()[0]
+            if key == 'posts':
+                for _ in cursor.elements():
+                    pass
+            else:
+                cursor.value()
+        return {}
+
+    def read_user(self):
+        """Read the user block, or None"""
+        cursor = _Cursor(self._mm)
+        for key in cursor.keys():
+            if key == 'user':
+                return cursor.value()[0]
+            if key == 'posts':
+                return None
+            cursor.value()
+        return None
+
+    def _iter_post_spans(self):
+        """Yield (post, byte offset, byte length) for every post"""
+        cursor = _Cursor(self._mm)
+        for key in cursor.keys():
+            if key == 'posts':
+                yield from cursor.elements()
+                return
+            cursor.value()
+
+    def iter_posts(self):
+        """Lazily yield posts (with their nested comments) one at a time"""
+        for post, _, _ in self._iter_post_spans():
+            yield post
+
+    def iter_comments(self):
+        """Lazily yield (post, comment) pairs"""
+        for post in self.iter_posts():
+            for comment in post.get('comments') or []:
+                yield post, comment
+
+    def build_index(self):
+        """
+        Write the sidecar index of byte offsets per post id
+
+        Returns:
+            Dictionary mapping post id to (offset, length)
+        """
+        stat = os.stat(self.filepath)
+        posts = {
+            post.get('id'): (offset, length)
+            for post, offset, length in self._iter_post_spans()
+        }
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'posts': posts}, f)
+
+        self._index = posts
+        return posts
+
+    def load_index(self):
+        """Load the sidecar index, rebuilding it if missing or stale"""
+        if self._index is not None:
+            return self._index
+
+        stat = os.stat(self.filepath)
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('size') == stat.st_size and index.get('mtime') == stat.st_mtime:
+                self._index = {post_id: tuple(span) for post_id, span in index['posts'].items()}
+                return self._index
+
+        return self.build_index()
+
+    def get_post(self, post_id):
+        """Random access to one post by id through the sidecar index, or None"""
+        span = self.load_index().get(post_id)
+        if span is None:
+            return None
+        offset, length = span
+        return json.loads(self._mm[offset:offset + length].decode('utf-8'))
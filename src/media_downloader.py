@@ -0,0 +1,187 @@
+"""
+Media downloader for post pictures and attachments
+Streams files to disk in parallel and stores them by content hash
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+
+
+def _attachment_urls(attachment):
+    """Yield media URLs from a Graph API attachment and its subattachments"""
+    image = (attachment.get('media') or {}).get('image') or {}
+    if image.get('src'):
+        yield image['src']
+    for sub in (attachment.get('subattachments') or {}).get('data', []):
+        yield from _attachment_urls(sub)
+
+
+def collect_media_urls(post):
+    """Get the unique media URLs referenced by a post, in order"""
+    urls = []
+    for key in ('full_picture', 'picture'):
+        if post.get(key):
+            urls.append(post[key])
+    for attachment in (post.get('attachments') or {}).get('data', []):
+        urls.extend(_attachment_urls(attachment))
+    return list(dict.fromkeys(urls))
+
+
+# CDN signature parameters that change between API calls for the same file
+_SIGNATURE_PARAMS = ('oh', 'oe')
+
+
+def _index_key(url):
+    """
+    Index key for a media URL: the URL without its rotating signature
+
+    Facebook CDN URLs carry signed parameters (oh, oe, _nc_*) that change
+    between API calls for the same file. Other parameters are kept, since
+    they pick the file for safe_image.php and lookaside URLs.
+    """
+    parts = urlparse(url)
+    query = [
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in _SIGNATURE_PARAMS and not name.startswith('_nc_')
+    ]
+    return urlunparse((parts.scheme, parts.netloc, parts.path, '', urlencode(query), ''))
+
+
+class MediaDownloader:
+    """Downloads post media into a content-addressed directory"""
+
+    def __init__(self, media_dir='data/media', workers=8, chunk_size=64 * 1024, timeout=30):
+        self.media_dir = media_dir
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.index_file = os.path.join(media_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        os.makedirs(media_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """Load the url -> local path index from earlier runs"""
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return {_index_key(url): path for url, path in json.load(f).items()}
+        return {}
+
+    def _save_index(self):
+        """Persist the url -> local path index"""
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2)
+
+    def _session(self):
+        """One keep-alive session per worker thread"""
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _extension(self, url, content_type):
+        """Pick a file extension from the response type or the URL"""
+        if content_type:
+            ext = mimetypes.guess_extension(content_type.split(';')[0].strip())
+            if ext:
+                return '.jpg' if ext == '.jpe' else ext
+        return os.path.splitext(urlparse(url).path)[1][:8]
+
+    def download(self, url):
+        """
+        Download one URL unless it is already stored
+
+        Returns:
+            Tuple of (local path, whether it was downloaded in this call)
+        """
+        key = _index_key(url)
+        with self._lock:
+            known = self.index.get(key)
+        if known and os.path.exists(known):
+            return known, False
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.media_dir, suffix='.part')
+        try:
+            # Own the descriptor first so failed requests close it too
+            with os.fdopen(fd, 'wb') as f:
+                with self._session().get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        digest.update(chunk)
+                        f.write(chunk)
+                    ext = self._extension(url, response.headers.get('Content-Type'))
+
+            name = digest.hexdigest()
+            target_dir = os.path.join(self.media_dir, name[:2])
+            os.makedirs(target_dir, exist_ok=True)
+            local_path = os.path.join(target_dir, name + ext)
+
+            # Same content under another URL: keep the existing copy
+            if os.path.exists(local_path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, local_path)
+
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.index[key] = local_path
+        return local_path, True
+
+    def download_posts(self, posts):
+        """
+        Download media for every post and record local paths on the posts
+
+        Each post with media gets a 'media_local' mapping of URL to local path
+        (None when the download failed) and, when its picture was stored,
+        a 'picture_local' path.
+
+        Returns:
+            Stats dictionary with downloaded/skipped/failed counts
+        """
+        urls = list(dict.fromkeys(
+            url for post in posts for url in collect_media_urls(post)
+        ))
+        results = {}
+        stats = {'downloaded': 0, 'skipped': 0, 'failed': 0}
+
+        def fetch(url):
+            try:
+                return url, self.download(url), None
+            except Exception as e:
+                return url, (None, False), e
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url, (local_path, downloaded), error in pool.map(fetch, urls):
+                results[url] = local_path
+                if error is not None:
+                    stats['failed'] += 1
+                elif downloaded:
+                    stats['downloaded'] += 1
+                else:
+                    stats['skipped'] += 1
+
+        self._save_index()
+
+        for post in posts:
+            post_urls = collect_media_urls(post)
+            if not post_urls:
+                continue
+            post['media_local'] = {url: results.get(url) for url in post_urls}
+            if post.get('picture') and results.get(post['picture']):
+                post['picture_local'] = results[post['picture']]
+
+        return stats
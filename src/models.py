@@ -0,0 +1,209 @@
+"""
+Compact record classes for posts and comments
+Slotted objects with interned author ids, plus zero-copy flat comment views
+"""
+
+import sys
+
+
+def _intern(value):
+    """Intern repeated strings such as author ids so copies share memory"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _or_default(value, default):
+    """Flat views fill in absent fields like flatten_comments does"""
+    return default if value is None else value
+
+
+def _extra(data, known_fields):
+    """Collect the fields a record class has no slot for, or None"""
+    unknown = data.keys() - known_fields
+    if not unknown:
+        return None
+    return {k: data[k] for k in unknown}
+
+
+class Comment:
+    """
+    One comment (or reply) on a post; uncommon fields live in 'extra'
+
+    Optional fields missing from the source dictionary are stored as None
+    and left out again by to_dict.
+    """
+
+    __slots__ = ('id', 'message', 'created_time', 'author', 'author_id', 'like_count', 'type',
+                 'extra', 'parent_id', 'replies')
+
+    FIELDS = frozenset(('id', 'message', 'created_time', 'author', 'author_id', 'like_count',
+                        'type', 'from', 'parent_id', 'replies'))
+
+    def __init__(self, id, message=None, created_time=None, author=None, author_id=None,
+                 like_count=None, type=None, extra=None, parent_id=None, replies=None):
+        self.id = id
+        self.message = message
+        self.created_time = created_time
+        self.author = _intern(author)
+        self.author_id = _intern(author_id)
+        self.like_count = like_count
+        self.type = type
+        self.extra = extra
+        self.parent_id = parent_id
+        self.replies = replies
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from an exported comment or a raw Graph API comment"""
+        if 'author_id' in data or 'author' in data:
+            author, author_id = data.get('author'), data.get('author_id')
+        else:
+            sender = data.get('from') or {}
+            author, author_id = sender.get('name'), sender.get('id')
+        return cls(
+            data.get('id'),
+            data.get('message'),
+            data.get('created_time'),
+            author,
+            author_id,
+            data.get('like_count'),
+            data.get('type'),
+            _extra(data, cls.FIELDS),
+            data.get('parent_id'),
+            [cls.from_dict(r) for r in data['replies']] if data.get('replies') else None,
+        )
+
+    def to_dict(self):
+        """Serialize in the nested export layout"""
+        data = {'id': self.id}
+        if self.message is not None:
+            data['message'] = self.message
+        if self.created_time is not None:
+            data['created_time'] = self.created_time
+        data['author'] = self.author
+        data['author_id'] = self.author_id
+        if self.like_count is not None:
+            data['like_count'] = self.like_count
+        if self.type is not None:
+            data['type'] = self.type
+        if self.extra:
+            data.update(self.extra)
+        if self.parent_id is not None:
+            data['parent_id'] = self.parent_id
+        if self.replies:
+            data['replies'] = [reply.to_dict() for reply in self.replies]
+        return data
+
+
+class Post:
+    """
+    A post with its comments; uncommon Graph fields live in 'extra'
+
+    Like Comment, absent optional fields are None and not serialized.
+    """
+
+    __slots__ = ('id', 'message', 'created_time', 'type', 'comments', 'extra')
+
+    FIELDS = frozenset(('id', 'message', 'created_time', 'type', 'comments'))
+
+    def __init__(self, id, message=None, created_time=None, type=None, comments=None, extra=None):
+        self.id = id
+        self.message = message
+        self.created_time = created_time
+        self.type = _intern(type)
+        self.comments = comments if comments is not None else []
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from an exported or raw post dictionary"""
+        return cls(
+            data.get('id'),
+            data.get('message'),
+            data.get('created_time'),
+            data.get('type'),
+            [Comment.from_dict(c) for c in data.get('comments') or []],
+            _extra(data, cls.FIELDS),
+        )
+
+    def to_dict(self):
+        """Serialize in the nested export layout"""
+        data = {'id': self.id}
+        if self.message is not None:
+            data['message'] = self.message
+        if self.created_time is not None:
+            data['created_time'] = self.created_time
+        if self.type is not None:
+            data['type'] = self.type
+        if self.extra:
+            data.update(self.extra)
+        data['comments'] = [comment.to_dict() for comment in self.comments]
+        return data
+
+
+class FlatComment:
+    """
+    Zero-copy view of a comment in the comments-only projection
+
+    Holds references to the comment and its post instead of copying their
+    fields, so flattening a pull adds one small object per comment.
+    """
+
+    __slots__ = ('comment', 'post')
+
+    def __init__(self, comment, post):
+        self.comment = comment
+        self.post = post
+
+    @property
+    def source_post(self):
+        return {'post_id': self.post.id, 'post_text': _or_default(self.post.message, '')}
+
+    @property
+    def text(self):
+        return _or_default(self.comment.message, '')
+
+    def row(self):
+        """Values in comment_formats.COLUMNS order"""
+        comment = self.comment
+        return (
+            comment.id,
+            self.text,
+            comment.created_time,
+            comment.author,
+            comment.author_id,
+            _or_default(comment.like_count, 0),
+            self.post.id,
+            _or_default(self.post.message, ''),
+            comment.parent_id,
+        )
+
+    def to_dict(self):
+        """Serialize in the comments-only export layout"""
+        comment = self.comment
+        data = {
+            'comment_id': comment.id,
+            'comment_text': self.text,
+            'created_time': comment.created_time,
+            'author': comment.author,
+            'author_id': comment.author_id,
+            'like_count': _or_default(comment.like_count, 0),
+            'source_post': self.source_post,
+        }
+        if comment.parent_id is not None:
+            data['parent_id'] = comment.parent_id
+        return data
+
+
+def _walk(comments):
+    """Comments depth-first, each followed by its replies"""
+    for comment in comments:
+        yield comment
+        if comment.replies:
+            yield from _walk(comment.replies)
+
+
+def iter_flat(posts):
+    """Yield a FlatComment view for every comment and reply of the given Post records"""
+    for post in posts:
+        for comment in _walk(post.comments):
+            yield FlatComment(comment, post)
@@ -0,0 +1,170 @@
+"""
+Multi-account downloader
+Runs one FacebookDataFetcher per account in a process (or thread) pool
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+
+# account_id goes into export filenames, so it must not carry a path
+ACCOUNT_ID_PATTERN = re.compile(r'[A-Za-z0-9_.-]+')
+
+
+def load_manifest(manifest_path):
+    """
+    Load the account manifest
+
+    The manifest is a JSON list (or {"accounts": [...]}) of entries like
+    {"account_id": "my_page", "token": "..."} or
+    {"account_id": "my_page", "token_file": "data/my_page_token.json"}.
+    Account ids may only use letters, digits, '_', '.' and '-'.
+
+    Returns:
+        List of account dictionaries
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    accounts = manifest.get('accounts', []) if isinstance(manifest, dict) else manifest
+
+    seen = set()
+    for i, account in enumerate(accounts, 1):
+        account_id = account.get('account_id')
+        if not account_id:
+            raise ValueError(f"Manifest entry {i} has no account_id")
+        if (not isinstance(account_id, str) or not ACCOUNT_ID_PATTERN.fullmatch(account_id)
+                or account_id.strip('.') == ''):
+            raise ValueError(f"Manifest entry {i} has an invalid account_id {account_id!r} "
+                             f"(use letters, digits, '_', '.' and '-')")
+        if account_id in seen:
+            raise ValueError(f"Duplicate account_id in manifest: {account_id}")
+        if not account.get('token') and not account.get('token_file'):
+            raise ValueError(f"Account {account_id} needs a token or token_file")
+        seen.add(account_id)
+
+    return accounts
+
+
+def _resolve_token(account):
+    """Get the access token for an account entry"""
+    if account.get('token'):
+        return account['token']
+
+    from facebook_auth import FacebookAuth
+    from token_manager import TokenManager
+    token = FacebookAuth().load_token(account['token_file'])
+    if not token:
+        raise ValueError(f"Could not load token from {account['token_file']}")
+    return TokenManager(account['token_file']).resolve(token)
+
+
+def download_account(account, limit=10):
+    """
+    Download one account's posts into its own export file
+
+    Runs inside a worker, so every account gets its own fetcher (and with it
+    its own request pacing) and never shares state with other accounts.
+
+    Returns:
+        Result dictionary for the combined summary
+    """
+    from facebook_fetcher import FacebookDataFetcher
+    from data_exporter import DataExporter
+
+    account_id = account['account_id']
+    start = time.perf_counter()
+    result = {'account_id': account_id, 'status': 'failed', 'file': None,
+              'posts': 0, 'comments': 0}
+
+    try:
+        fetcher = FacebookDataFetcher(_resolve_token(account))
+        user_info = fetcher.get_user_info()
+        posts = fetcher.get_posts(limit=max(limit, 1))
+
+        result['posts'] = len(posts)
+        result['comments'] = sum(len(post.get('comments') or []) for post in posts)
+
+        if posts:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result['file'] = DataExporter().export_posts_with_comments(
+                posts, user_info, filename=f"facebook_data_{account_id}_{timestamp}.json"
+            )
+            result['status'] = 'ok'
+        else:
+            result['status'] = 'empty'
+
+    except Exception as e:
+        result['error'] = str(e)
+
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_accounts(accounts, limit=10, workers=4, use_threads=False, on_result=None):
+    """
+    Download several accounts in parallel
+
+    Args:
+        accounts: Account dictionaries from load_manifest
+        limit: Posts to download per account
+        workers: Pool size
+        use_threads: Use a thread pool instead of a process pool
+        on_result: Optional callback invoked with each result as it finishes
+
+    Returns:
+        List of result dictionaries in manifest order
+    """
+    pool_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    results = {}
+
+    with pool_class(max_workers=max(1, min(workers, len(accounts) or 1))) as pool:
+        futures = {
+            pool.submit(download_account, account, limit): account['account_id']
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            account_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'account_id': account_id, 'status': 'failed', 'file': None,
+                          'posts': 0, 'comments': 0, 'error': str(e)}
+            results[account_id] = result
+            if on_result:
+                on_result(result)
+
+    return [results[account['account_id']] for account in accounts]
+
+
+def summarize_results(results, elapsed=None):
+    """Combine per-account results into one summary dictionary"""
+    summary = {
+        'generated_at': datetime.now().isoformat(),
+        'accounts': len(results),
+        'succeeded': sum(1 for r in results if r['status'] == 'ok'),
+        'empty': sum(1 for r in results if r['status'] == 'empty'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'total_posts': sum(r['posts'] for r in results),
+        'total_comments': sum(r['comments'] for r in results),
+        'results': results,
+    }
+    if elapsed is not None:
+        summary['elapsed_seconds'] = round(elapsed, 3)
+    return summary
+
+
+def write_summary(summary, output_dir='data'):
+    """Write the combined summary next to the exports and return its path"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filepath = os.path.join(output_dir, f"accounts_summary_{timestamp}.json")
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    return filepath
@@ -0,0 +1,223 @@
+"""
+Graph API response cache
+Size-bounded in-memory LRU over an SQLite store, wrapped around a fetcher's _make_request
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+# Seconds a response stays fresh, by the last segment of its endpoint path
+DEFAULT_TTLS = {
+    'me': 3600,
+    'posts': 300,
+    'comments': 600,
+}
+
+# Endpoints not listed above (single posts, other edges)
+DEFAULT_TTL = 300
+
+# Credentials are never part of a key and never written to disk
+SECRET_PARAMS = ('access_token', 'appsecret_proof')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    body TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_responses_used_at ON responses (used_at);
+"""
+
+
+def _fingerprint(token):
+    """Short stable identifier for a token that does not reveal it"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(endpoint, params=None, scope=None):
+    """
+    Key for one request: scope, endpoint path and sorted params
+
+    Paging 'next' links carry their params in the query string, so they
+    are merged with 'params'; the API version prefix and credentials are
+    dropped. 'scope' (usually the access token) keeps the responses of
+    different tokens apart.
+    """
+    parts = urlsplit(endpoint)
+    query = dict(parse_qsl(parts.query))
+    query.update(params or {})
+    token = query.pop('access_token', None)
+    for name in SECRET_PARAMS:
+        query.pop(name, None)
+
+    segments = [segment for segment in parts.path.split('/') if segment]
+    if segments and segments[0].startswith('v') and segments[0][1:].replace('.', '').isdigit():
+        segments = segments[1:]
+
+    key = '/'.join(segments)
+    if query:
+        key += '?' + urlencode(sorted((name, str(value)) for name, value in query.items()))
+    scope = scope or token
+    return f'{_fingerprint(scope)}:{key}' if scope else key
+
+
+class ResponseCache:
+    """
+    Caches successful Graph API responses by endpoint and params
+
+    Responses are kept as JSON text, so callers can modify what they get
+    back. The newest ones stay in memory up to 'max_bytes' (least recently
+    used first out); all of them are written to an SQLite file, which keeps
+    at most 'max_disk_entries'. How long a response stays fresh depends on
+    its endpoint (see DEFAULT_TTLS). Error responses are not cached.
+
+    Graph API ETags would allow cheap revalidation, but _make_request only
+    returns the decoded body, so expired entries are simply fetched again.
+    """
+
+    def __init__(self, db_path='data/graph_cache.db', max_bytes=32 * 1024 * 1024,
+                 max_disk_entries=50000, ttls=None, default_ttl=DEFAULT_TTL, clock=time.time):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+
+        self.conn = None
+        if db_path:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            # Reply workers share the cache, so calls are serialized by _lock
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def ttl(self, key):
+        """Seconds a response for this key stays fresh"""
+        path = key.split(':', 1)[-1].split('?', 1)[0]
+        return self.ttls.get(path.rsplit('/', 1)[-1], self.default_ttl)
+
+    def _remember(self, key, expires_at, body):
+        """Put a body in the memory LRU, evicting the least recently used"""
+        old = self.memory.pop(key, None)
+        if old:
+            self.memory_bytes -= len(old[1])
+        if len(body) > self.max_bytes:
+            return
+        self.memory[key] = (expires_at, body)
+        self.memory_bytes += len(body)
+        while self.memory_bytes > self.max_bytes:
+            _, (_, evicted) = self.memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+            self.stats['evicted'] += 1
+
+    def get(self, key):
+        """A fresh cached response for the key, or None"""
+        now = self.clock()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry and entry[0] <= now:
+                self.memory_bytes -= len(entry[1])
+                del self.memory[key]
+                entry = None
+
+            if entry:
+                self.memory.move_to_end(key)
+            elif self.conn:
+                row = self.conn.execute(
+                    'SELECT expires_at, body FROM responses WHERE key = ? AND expires_at > ?',
+                    (key, now),
+                ).fetchone()
+                if row:
+                    entry = row
+                    self.conn.execute('UPDATE responses SET used_at = ? WHERE key = ?', (now, key))
+                    self.conn.commit()
+                    self._remember(key, *entry)
+
+            if not entry:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+        return json.loads(entry[1])
+
+    def put(self, key, response):
+        """Store a successful response"""
+        ttl = self.ttl(key)
+        if ttl <= 0 or not isinstance(response, dict) or 'error' in response:
+            return
+        now = self.clock()
+        body = json.dumps(response, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._remember(key, now + ttl, body)
+            self.stats['stored'] += 1
+            if self.conn:
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO responses (key, expires_at, used_at, body) VALUES (?, ?, ?, ?)',
+                    (key, now + ttl, now, body),
+                )
+                if self.stats['stored'] % 100 == 0:
+                    self._prune(now)
+                self.conn.commit()
+
+    def _prune(self, now):
+        """Drop expired rows and the least recently used beyond max_disk_entries"""
+        self.conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        self.conn.execute(
+            'DELETE FROM responses WHERE key IN '
+            '(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk_entries,),
+        )
+
+    def wrap(self, fetcher, scope=None):
+        """
+        Serve a fetcher's _make_request calls from the cache
+
+        The wrapper is set on the instance, like RunMetrics.instrument, so
+        every request the fetcher makes goes through it.
+
+        Args:
+            fetcher: Object with a _make_request(endpoint, params=None, ...) method
+            scope: Keeps responses apart per token (usually the access token)
+        """
+        make_request = fetcher._make_request
+
+        @functools.wraps(make_request)
+        def cached(*args, **kwargs):
+            endpoint = args[0] if args else kwargs.get('endpoint', kwargs.get('url', ''))
+            params = args[1] if len(args) > 1 else kwargs.get('params')
+            key = cache_key(endpoint, params, scope)
+            response = self.get(key)
+            if response is not None:
+                return response
+            response = make_request(*args, **kwargs)
+            self.put(key, response)
+            return response
+
+        fetcher._make_request = cached
+        return fetcher
+
+    def summary(self):
+        """Hit/miss counts with the hit rate"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return dict(self.stats, hit_rate=round(self.stats['hits'] / lookups, 4) if lookups else 0.0)
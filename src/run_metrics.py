@@ -0,0 +1,217 @@
+"""
+Run metrics for downloads and exports
+Per-phase timers, counters and latency histograms with JSON/Prometheus output
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from throttle_backoff import throttle_code
+
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The fetcher method every API request goes through; response sizes are
+# recorded here only, so nested results are not counted again
+REQUEST_METHOD = '_make_request'
+
+# Fetch overhead is this method's time minus the requests made inside it
+FETCH_METHOD = 'get_posts'
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus style"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class RunMetrics:
+    """
+    Collects timings and counters for one CLI run
+
+    Instrumented objects may be called from worker threads (reply and
+    comment fetchers), so every update is made under one lock.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self.phases = {}
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        # get_posts nesting depth per thread: only requests made on the
+        # thread running get_posts are inside it
+        self._fetching = threading.local()
+        self._fetch_request_seconds = None
+
+    def count(self, name, value=1):
+        """Add to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """Set a value that is reported as it is, not summed (e.g. the exit code)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        """Record one latency sample"""
+        with self._lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    def _add_time(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block of work under a phase name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_time(name, time.perf_counter() - start)
+
+    def instrument(self, obj, method_names, prefix):
+        """
+        Time calls to methods of one object
+
+        The wrapper is set on the instance, so calls the object makes to its
+        own methods (self._make_request(...)) are measured too. Methods the
+        object does not have are skipped.
+        """
+        for name in method_names:
+            method = getattr(obj, name, None)
+            if callable(method):
+                setattr(obj, name, self._wrap(method, f'{prefix}.{name}', name))
+
+    def _wrap(self, method, name, method_name):
+        """Wrap a callable with call/error counters and a latency histogram"""
+        is_fetch = method_name == FETCH_METHOD
+        is_request = method_name == REQUEST_METHOD
+
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            fetching = getattr(self._fetching, 'depth', 0)
+            if is_fetch:
+                self._fetching.depth = fetching + 1
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                self.count(f'{name}.errors')
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.count(f'{name}.calls')
+                self.observe(name, elapsed)
+                self._add_time(name, elapsed)
+                if is_fetch:
+                    self._fetching.depth = fetching
+                elif is_request and fetching:
+                    with self._lock:
+                        self._fetch_request_seconds = (self._fetch_request_seconds or 0.0) + elapsed
+            self._record_size(name, result, is_request)
+            return result
+        return timed
+
+    def _record_size(self, name, result, is_request):
+        """Count bytes for API responses (JSON size) and written files, and rate-limited responses"""
+        if is_request and isinstance(result, (dict, list)):
+            self.count(f'{name}.response_json_bytes', len(json.dumps(result)))
+            if throttle_code(result) is not None:
+                self.count(f'{name}.throttled')
+        elif isinstance(result, str) and os.path.isfile(result):
+            self.count(f'{name}.bytes_written', os.path.getsize(result))
+
+    def report(self):
+        """The run report as a JSON-serializable dictionary"""
+        phases = {name: round(seconds, 6) for name, seconds in sorted(self.phases.items())}
+        report = {
+            'started_at': self.started_at,
+            'elapsed_seconds': round(time.perf_counter() - self._start, 6),
+            'phases': phases,
+            'counters': dict(sorted(self.counters.items())),
+            'gauges': dict(sorted(self.gauges.items())),
+            'latency': {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+        }
+
+        # Time in get_posts not spent inside its requests: rate-limit sleeps
+        # and parsing (requests made outside get_posts are not subtracted)
+        fetch = self.phases.get(f'fetcher.{FETCH_METHOD}')
+        if fetch is not None and self._fetch_request_seconds is not None:
+            report['fetch_overhead_seconds'] = round(fetch - self._fetch_request_seconds, 6)
+
+        return report
+
+    def write_report(self, filepath):
+        """Write the JSON run report"""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        return filepath
+
+    def prometheus(self):
+        """The metrics in Prometheus text exposition format"""
+        def metric(name):
+            return 'fbdl_' + name.replace('.', '_').lstrip('_').replace('__', '_')
+
+        lines = [
+            '# TYPE fbdl_run_seconds gauge',
+            f'fbdl_run_seconds {time.perf_counter() - self._start:.6f}',
+            '# TYPE fbdl_phase_seconds gauge',
+        ]
+        for name, seconds in sorted(self.phases.items()):
+            lines.append(f'fbdl_phase_seconds{{phase="{name}"}} {seconds:.6f}')
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {metric(name)}_total counter')
+            lines.append(f'{metric(name)}_total {value}')
+
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f'# TYPE {metric(name)} gauge')
+            lines.append(f'{metric(name)} {value}')
+
+        for name, histogram in sorted(self.histograms.items()):
+            base = metric(name) + '_seconds'
+            lines.append(f'# TYPE {base} histogram')
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{base}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{base}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f'{base}_sum {histogram.sum:.6f}')
+            lines.append(f'{base}_count {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, filepath):
+        """Write the Prometheus text file (e.g. for node_exporter's textfile collector)"""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        return filepath
@@ -0,0 +1,315 @@
+"""
+SQLite-backed local store for downloaded Facebook data
+Indexes export files so info screens and comment lookups avoid full JSON parses
+"""
+
+import json
+import os
+import sqlite3
+
+from export_reader import ExportReader
+from models import Comment, Post
+from reply_threads import walk_with_parents
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    source TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    exported_at TEXT,
+    platform TEXT,
+    user_id TEXT,
+    user_json TEXT,
+    total_posts INTEGER NOT NULL DEFAULT 0,
+    total_comments INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    created_time TEXT,
+    message TEXT,
+    raw TEXT NOT NULL,
+    PRIMARY KEY (source, position)
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    source TEXT NOT NULL,
+    post_position INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    id TEXT,
+    post_id TEXT NOT NULL,
+    author TEXT,
+    author_id TEXT,
+    created_time TEXT,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    message TEXT,
+    raw TEXT NOT NULL,
+    parent_id TEXT,
+    PRIMARY KEY (source, post_position, position)
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_id ON posts (id);
+CREATE INDEX IF NOT EXISTS idx_posts_created_time ON posts (created_time);
+CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments (post_id);
+CREATE INDEX IF NOT EXISTS idx_comments_author_id ON comments (author_id);
+CREATE INDEX IF NOT EXISTS idx_comments_created_time ON comments (created_time);
+"""
+
+# Created after the parent_id column is known to exist (see _migrate)
+PARENT_INDEX = 'CREATE INDEX IF NOT EXISTS idx_comments_parent_id ON comments (parent_id)'
+
+
+def _comment_author(comment):
+    """Return (author, author_id) for exported or raw Graph API comments"""
+    if 'author' in comment or 'author_id' in comment:
+        return comment.get('author'), comment.get('author_id')
+    sender = comment.get('from') or {}
+    return sender.get('name'), sender.get('id')
+
+
+def _nest(top_level, by_id, comment_id, parent_id, comment, replies_of):
+    """Put a rebuilt comment under its parent, or at the top level"""
+    parent = by_id.get(parent_id) if parent_id is not None else None
+    if parent is None:
+        top_level.append(comment)
+    else:
+        replies_of(parent).append(comment)
+    by_id[comment_id] = comment
+
+
+def _dict_replies(comment):
+    return comment.setdefault('replies', [])
+
+
+def _record_replies(comment):
+    if comment.replies is None:
+        comment.replies = []
+    return comment.replies
+
+
+class SQLiteStore:
+    """
+    Indexed SQLite mirror of the facebook_data_*.json export files
+
+    Replies are stored as rows of their own in 'comments', with their
+    parent's id in parent_id, so lookups by author or post include them.
+    """
+
+    def __init__(self, db_path='data/facebook_data.db'):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add parent_id to stores made before replies were indexed"""
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(comments)')}
+        if 'parent_id' not in columns:
+            # Replies were never stored, so every file is indexed again on the next sync
+            with self.conn:
+                self.conn.execute('ALTER TABLE comments ADD COLUMN parent_id TEXT')
+                self.conn.execute('DELETE FROM comments')
+                self.conn.execute('DELETE FROM posts')
+                self.conn.execute('DELETE FROM metadata')
+        self.conn.execute(PARENT_INDEX)
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def sync(self, json_files):
+        """
+        Bring the store in line with the given export files
+
+        Returns:
+            Number of files (re)indexed
+        """
+        indexed = sum(1 for path in json_files if self.sync_file(path))
+        self.prune(json_files)
+        return indexed
+
+    def sync_file(self, filepath):
+        """Index an export file if it is new or its size/mtime changed"""
+        stat = os.stat(filepath)
+        row = self.conn.execute(
+            'SELECT mtime, size FROM metadata WHERE source = ?', (filepath,)
+        ).fetchone()
+        if row and (row['mtime'], row['size']) == (stat.st_mtime, stat.st_size):
+            return False
+
+        self.ingest_file(filepath)
+        return True
+
+    def prune(self, json_files):
+        """Drop export files that no longer exist on disk from the store"""
+        known = {row['source'] for row in self.conn.execute('SELECT source FROM metadata')}
+        stale = known - set(json_files)
+        with self.conn:
+            for source in stale:
+                self._delete_source(source)
+
+    def ingest_file(self, filepath):
+        """Stream one export file into the store, replacing any earlier copy"""
+        stat = os.stat(filepath)
+        with ExportReader(filepath) as reader:
+            self.ingest_posts(
+                filepath,
+                reader.iter_posts(),
+                user_info=reader.read_user(),
+                metadata=reader.read_metadata(),
+                mtime=stat.st_mtime,
+                size=stat.st_size,
+            )
+
+    def ingest_posts(self, source, posts, user_info=None, metadata=None, mtime=0.0, size=0):
+        """
+        Load a list of posts with nested comments under the given source name
+
+        Replies nested under a comment become rows of their own that follow
+        their parent; a comment's raw JSON is stored without its replies.
+        """
+        metadata = metadata or {}
+        user_info = user_info or {}
+
+        post_rows = []
+        comment_rows = []
+        top_level = 0
+        for post_pos, post in enumerate(posts):
+            comments = post.get('comments') or []
+            post_body = {k: v for k, v in post.items() if k != 'comments'}
+            post_rows.append((
+                source, post_pos, post.get('id'), post.get('created_time'),
+                post.get('message'), json.dumps(post_body, ensure_ascii=False),
+            ))
+            top_level += len(comments)
+            for comment_pos, (comment, parent_id) in enumerate(walk_with_parents(comments)):
+                author, author_id = _comment_author(comment)
+                body = {k: v for k, v in comment.items() if k != 'replies'}
+                comment_rows.append((
+                    source, post_pos, comment_pos, comment.get('id'), post.get('id'),
+                    author, author_id, comment.get('created_time'),
+                    comment.get('like_count', 0) or 0, comment.get('message'),
+                    json.dumps(body, ensure_ascii=False), parent_id,
+                ))
+
+        with self.conn:
+            self._delete_source(source)
+            self.conn.execute(
+                'INSERT INTO metadata (source, mtime, size, exported_at, platform, user_id, '
+                'user_json, total_posts, total_comments) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    source, mtime, size, metadata.get('exported_at'),
+                    metadata.get('platform', 'facebook'), user_info.get('id'),
+                    json.dumps(user_info, ensure_ascii=False),
+                    metadata.get('total_posts', len(post_rows)),
+                    metadata.get('total_comments', top_level),
+                ),
+            )
+            self.conn.executemany(
+                'INSERT INTO posts (source, position, id, created_time, message, raw) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                post_rows,
+            )
+            self.conn.executemany(
+                'INSERT INTO comments (source, post_position, position, id, post_id, author, '
+                'author_id, created_time, like_count, message, raw, parent_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                comment_rows,
+            )
+
+    def _delete_source(self, source):
+        """Remove every row belonging to one export file"""
+        self.conn.execute('DELETE FROM comments WHERE source = ?', (source,))
+        self.conn.execute('DELETE FROM posts WHERE source = ?', (source,))
+        self.conn.execute('DELETE FROM metadata WHERE source = ?', (source,))
+
+    def get_file_metadata(self, source):
+        """Get the metadata row for one export file, or None"""
+        row = self.conn.execute(
+            'SELECT * FROM metadata WHERE source = ?', (source,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_posts(self, source):
+        """Rebuild the posts list (with nested comments and replies) for one export file"""
+        posts = []
+        for row in self.conn.execute(
+            'SELECT raw FROM posts WHERE source = ? ORDER BY position', (source,)
+        ):
+            post = json.loads(row['raw'])
+            post['comments'] = []
+            posts.append(post)
+
+        by_id = {}
+        for row in self.conn.execute(
+            'SELECT post_position, id, parent_id, raw FROM comments WHERE source = ? '
+            'ORDER BY post_position, position',
+            (source,),
+        ):
+            _nest(posts[row['post_position']]['comments'], by_id, row['id'], row['parent_id'],
+                  json.loads(row['raw']), _dict_replies)
+
+        return posts
+
+    def get_post_records(self, source):
+        """
+        Rebuild the posts of one export file as Post/Comment records
+
+        Each row becomes a record as it is read, so the post and comment
+        dictionaries of the whole file are never held at once.
+        """
+        posts = [
+            Post.from_dict(json.loads(row['raw'])) for row in self.conn.execute(
+                'SELECT raw FROM posts WHERE source = ? ORDER BY position', (source,)
+            )
+        ]
+
+        by_id = {}
+        for row in self.conn.execute(
+            'SELECT post_position, id, parent_id, raw FROM comments WHERE source = ? '
+            'ORDER BY post_position, position',
+            (source,),
+        ):
+            _nest(posts[row['post_position']].comments, by_id, row['id'], row['parent_id'],
+                  Comment.from_dict(json.loads(row['raw'])), _record_replies)
+
+        return posts
+
+    def get_post(self, post_id):
+        """Find the most recently exported copy of a post by id, or None"""
+        row = self.conn.execute(
+            'SELECT p.source, p.position, p.raw FROM posts p '
+            'JOIN metadata m ON m.source = p.source '
+            'WHERE p.id = ? ORDER BY m.exported_at DESC LIMIT 1',
+            (post_id,),
+        ).fetchone()
+        if not row:
+            return None
+
+        post = json.loads(row['raw'])
+        post['comments'] = []
+        by_id = {}
+        for c in self.conn.execute(
+            'SELECT id, parent_id, raw FROM comments WHERE source = ? AND post_position = ? '
+            'ORDER BY position',
+            (row['source'], row['position']),
+        ):
+            _nest(post['comments'], by_id, c['id'], c['parent_id'], json.loads(c['raw']), _dict_replies)
+        return post
+
+    def get_comments_by_author(self, author_id):
+        """Get every stored comment or reply written by the given author id"""
+        return [
+            dict(row) for row in self.conn.execute(
+                'SELECT id, post_id, parent_id, author, author_id, created_time, like_count, '
+                'message, source FROM comments WHERE author_id = ? ORDER BY created_time',
+                (author_id,),
+            )
+        ]
@@ -0,0 +1,88 @@
+"""
+Backoff for Graph API rate limiting
+Retries throttled requests after a randomized, growing delay, wrapped around a fetcher's _make_request
+"""
+
+import functools
+import random
+import threading
+import time
+
+
+# Rate-limit error codes: application (4), user (17), page (32), custom (613)
+THROTTLE_CODES = frozenset((4, 17, 32, 613))
+
+
+def throttle_code(response):
+    """The Graph API rate-limit error code in a response body, or None"""
+    if not isinstance(response, dict):
+        return None
+    error = response.get('error')
+    if not isinstance(error, dict):
+        return None
+    try:
+        code = int(error.get('code'))
+    except (TypeError, ValueError):
+        return None
+    return code if code in THROTTLE_CODES else None
+
+
+class ThrottleBackoff:
+    """
+    Retries requests the Graph API rejected for rate limiting
+
+    A throttled request is retried after a random delay between 0 and
+    base_delay * 2 ** attempt, capped at max_delay ("full jitter"), so
+    workers that were throttled together do not retry together. After
+    'retries' attempts the error response is returned as it is.
+
+    Usage headers (X-App-Usage) would allow slowing down before the first
+    error, but _make_request only returns the decoded body, so only the
+    error codes in the body are used.
+    """
+
+    def __init__(self, retries=5, base_delay=1.0, max_delay=60.0, sleep=time.sleep, random=random.random):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.random = random
+        self.stats = {'throttled': 0, 'retries': 0, 'gave_up': 0, 'waited_seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number 'attempt' (0-based)"""
+        return self.random() * min(self.max_delay, self.base_delay * 2 ** attempt)
+
+    def wrap(self, fetcher):
+        """
+        Retry a fetcher's throttled _make_request calls
+
+        The wrapper is set on the instance, like ResponseCache.wrap, so
+        every request the fetcher makes goes through it.
+
+        Args:
+            fetcher: Object with a _make_request method returning the response body
+        """
+        make_request = fetcher._make_request
+
+        @functools.wraps(make_request)
+        def backed_off(*args, **kwargs):
+            attempt = 0
+            while True:
+                response = make_request(*args, **kwargs)
+                if throttle_code(response) is None:
+                    return response
+                with self._lock:
+                    self.stats['throttled'] += 1
+                    if attempt >= self.retries:
+                        self.stats['gave_up'] += 1
+                        return response
+                    wait = self.delay(attempt)
+                    self.stats['retries'] += 1
+                    self.stats['waited_seconds'] += wait
+                self.sleep(wait)
+                attempt += 1
+
+        fetcher._make_request = backed_off
+        return fetcher
@@ -0,0 +1,241 @@
+"""
+Access token lifecycle management
+Long-lived token exchange, expiry tracking, cached validation and background refresh
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+
+GRAPH_URL = 'https://graph.facebook.com'
+
+# Re-validate a token against the API at most this often
+VALIDATION_TTL = 3600
+
+# Exchange a token for a fresh long-lived one this long before it expires
+REFRESH_MARGIN = 7 * 24 * 3600
+
+# Re-exchanging a token near its end does not always extend it; wait this
+# long before trying again
+REFRESH_RETRY = 3600
+
+
+def _fingerprint(token):
+    """Stable identifier for a token that does not reveal it"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def exchange_long_lived(token, app_id=None, app_secret=None, timeout=30):
+    """
+    Exchange a user token for a long-lived one (about 60 days)
+
+    App credentials default to FACEBOOK_APP_ID / FACEBOOK_APP_SECRET.
+    A long-lived token can be exchanged again to extend it.
+
+    Returns:
+        Tuple of (access token, expires_in seconds or None)
+    """
+    if not (app_id and app_secret):
+        from dotenv import load_dotenv
+        load_dotenv()
+    app_id = app_id or os.getenv('FACEBOOK_APP_ID')
+    app_secret = app_secret or os.getenv('FACEBOOK_APP_SECRET')
+    if not app_id or not app_secret:
+        raise ValueError("FACEBOOK_APP_ID and FACEBOOK_APP_SECRET are needed to exchange tokens")
+
+    response = requests.get(
+        f'{GRAPH_URL}/oauth/access_token',
+        params={
+            'grant_type': 'fb_exchange_token',
+            'client_id': app_id,
+            'client_secret': app_secret,
+            'fb_exchange_token': token,
+        },
+        timeout=timeout,
+    )
+    data = response.json()
+    if 'error' in data:
+        raise ValueError(data['error'].get('message', 'Token exchange failed'))
+    return data['access_token'], data.get('expires_in')
+
+
+class TokenManager:
+    """
+    Tracks the token saved by FacebookAuth in a '<token file>.state' sidecar
+
+    The sidecar holds the long-lived token exchanged from the saved one,
+    its expiry and the last successful validation. The token file itself
+    is left in FacebookAuth's format; the sidecar is tied to it by a
+    fingerprint, so re-authenticating (a new saved token) starts over.
+    """
+
+    def __init__(self, token_file='data/token.json', validation_ttl=VALIDATION_TTL,
+                 refresh_margin=REFRESH_MARGIN, exchange=exchange_long_lived):
+        self.token_file = token_file
+        self.state_file = token_file + '.state'
+        self.validation_ttl = validation_ttl
+        self.refresh_margin = refresh_margin
+        self.exchange = exchange
+        self.state = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_state(self, source_token):
+        """Read the sidecar if it belongs to the given saved token"""
+        self.state = {}
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            if state.get('source') == _fingerprint(source_token):
+                self.state = state
+        if not self.state:
+            self.state = {'source': _fingerprint(source_token)}
+
+    def _save_state(self):
+        """Write the sidecar, readable by the owner only"""
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.state_file + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_file)
+
+    @property
+    def token(self):
+        return self.state.get('access_token')
+
+    @property
+    def expires_at(self):
+        return self.state.get('expires_at')
+
+    def seconds_left(self):
+        """Seconds until the current token expires, or None if unknown"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+    def needs_refresh(self):
+        """True once the token is inside the refresh margin"""
+        left = self.seconds_left()
+        return left is not None and left <= self.refresh_margin
+
+    def exchanged_recently(self, interval=REFRESH_RETRY):
+        """True if the last exchange was less than 'interval' seconds ago"""
+        exchanged_at = self.state.get('exchanged_at')
+        return exchanged_at is not None and time.time() - exchanged_at < interval
+
+    def _exchange(self, token):
+        """Exchange a token and record the result"""
+        new_token, expires_in = self.exchange(token)
+        self.state['access_token'] = new_token
+        self.state['expires_at'] = time.time() + expires_in if expires_in else None
+        self.state['exchanged_at'] = time.time()
+        self.state['long_lived'] = True
+        self.state.pop('validated_at', None)
+        self._save_state()
+        return new_token
+
+    def resolve(self, source_token):
+        """
+        The token to use for the saved token
+
+        The first time, the saved token is exchanged for a long-lived one;
+        afterwards the stored long-lived token is used, and exchanged again
+        once it is inside the refresh margin (at most once per
+        REFRESH_RETRY, since an exchange close to the end may not extend
+        it). If exchanging fails (no app credentials, network error), the
+        best token at hand is returned.
+        """
+        with self._lock:
+            self._load_state(source_token)
+            current = self.token or source_token
+            if self.token and (not self.needs_refresh() or self.exchanged_recently()):
+                return current
+            try:
+                return self._exchange(current)
+            except (ValueError, KeyError, requests.RequestException):
+                return current
+
+    def validate(self, check):
+        """
+        Validate the current token, reusing a recent result
+
+        Args:
+            check: Callable that hits the API and returns user info (falsy or
+                raising if the token is bad)
+
+        Returns:
+            User info dictionary, or None if the token is invalid
+        """
+        validated_at = self.state.get('validated_at')
+        if validated_at and time.time() - validated_at < self.validation_ttl:
+            return self.state.get('user')
+
+        try:
+            user = check()
+        except Exception:
+            user = None
+        if not user or 'error' in user:
+            return None
+
+        with self._lock:
+            self.state['validated_at'] = time.time()
+            self.state['user'] = user
+            self._save_state()
+        return user
+
+    def start_refresh(self, on_refresh=None, poll_interval=3600):
+        """
+        Refresh the token in a background thread before it expires
+
+        Args:
+            on_refresh: Called with the new token after each refresh
+            poll_interval: Longest sleep between expiry checks, in seconds
+        """
+        if self._thread or not self.token:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                left = self.seconds_left()
+                if left is None:
+                    return
+                wait = max(0, left - self.refresh_margin)
+                if wait == 0 and self.exchanged_recently(poll_interval):
+                    # The last exchange did not get the token out of the margin
+                    wait = poll_interval - (time.time() - self.state['exchanged_at'])
+                if wait > 0:
+                    self._stop.wait(min(wait, poll_interval))
+                    continue
+                try:
+                    with self._lock:
+                        new_token = self._exchange(self.token)
+                except (ValueError, KeyError, requests.RequestException):
+                    # An expired token cannot be exchanged; re-authenticate
+                    if left <= 0:
+                        return
+                    self._stop.wait(min(poll_interval, max(left / 2, 60)))
+                    continue
+                if on_refresh:
+                    on_refresh(new_token)
+
+        self._thread = threading.Thread(target=run, name='token-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
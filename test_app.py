@@ -7,6 +7,7 @@ Simulates the download workflow without needing actual Facebook credentials
 import json
 import os
 import sys
+import time
 from pathlib import Path
 
 # Add src directory to path
@@ -173,6 +174,1140 @@ def test_data_exporter():
     return True
 
 
+def test_sqlite_store():
+    """Test indexing export files into the SQLite store"""
+    print("\n" + "="*70)
+    print("Testing SQLite Store".center(70))
+    print("="*70)
+    
+    try:
+        from sqlite_store import SQLiteStore
+        
+        print("\n✓ Indexing test export file...")
+        store = SQLiteStore('data/test_store.db')
+        source = 'data/test_posts.json'
+        
+        assert store.sync([source]) == 1, "Export file not indexed"
+        assert store.sync([source]) == 0, "Unchanged file re-indexed"
+        
+        metadata = store.get_file_metadata(source)
+        assert metadata['total_posts'] == 2, "Wrong post count"
+        assert metadata['total_comments'] == 3, "Wrong comment count"
+        print(f"  ✓ Metadata: {metadata['total_posts']} posts, {metadata['total_comments']} comments")
+        
+        with open(source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert store.get_posts(source) == data['posts'], "Posts not rebuilt from store"
+        print("  ✓ Posts rebuilt with nested comments")
+        
+        by_author = store.get_comments_by_author('user_1')
+        assert [c['id'] for c in by_author] == ['comment_1_1'], "Author lookup failed"
+        print("  ✓ Comments looked up by author_id")
+        
+        print("\n✓ Indexing reply threads...")
+        nested = {'id': 'reply_2', 'message': 'Nested', 'author': 'Commenter One', 'author_id': 'user_1', 'parent_id': 'reply_1'}
+        data['posts'][0]['comments'][0]['replies'] = [
+            {'id': 'reply_1', 'message': 'Only a reply', 'author': 'Replier', 'author_id': 'user_9',
+             'parent_id': 'comment_1_1', 'replies': [nested]},
+        ]
+        data['metadata']['exported_at'] = '2099-01-01T00:00:00'
+        replies_source = 'data/test_store_replies.json'
+        with open(replies_source, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        store.sync_file(replies_source)
+        by_author = store.get_comments_by_author('user_9')
+        assert [(c['id'], c['parent_id']) for c in by_author] == [('reply_1', 'comment_1_1')], "Reply author not found"
+        assert 'reply_2' in [c['id'] for c in store.get_comments_by_author('user_1')], "Nested reply not indexed"
+        assert store.get_posts(replies_source) == data['posts'], "Reply threads not rebuilt"
+        assert store.get_post('post_1') == data['posts'][0], "Reply threads not rebuilt for one post"
+        records = store.get_post_records(replies_source)
+        assert records[0].comments[0].replies[0].replies[0].id == 'reply_2', "Reply records not nested"
+        assert store.get_file_metadata(replies_source)['total_comments'] == 3, "Replies counted as comments"
+        print("  ✓ Replies stored as rows and nested again on the way out")
+        
+        store.sync([])
+        os.remove(replies_source)
+        assert store.get_file_metadata(source) is None, "Stale file not pruned"
+        print("  ✓ Removed files pruned from store")
+        
+        store.close()
+        os.remove('data/test_store.db')
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_comment_formats():
+    """Test JSON Lines and columnar comment exports"""
+    print("\n" + "="*70)
+    print("Testing Comment Export Formats".center(70))
+    print("="*70)
+    
+    try:
+        from comment_formats import export_comments, iter_jsonl, read_columnar
+        
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            posts = json.load(f)['posts']
+        
+        print("\n✓ Exporting comments as JSON Lines...")
+        filepath = export_comments(posts, 'jsonl', filename='test_comments.jsonl')
+        comments = list(iter_jsonl(filepath))
+        assert len(comments) == 3, "Wrong comment count"
+        assert comments[0]['source_post']['post_id'] == 'post_1', "Source post not linked"
+        print(f"  ✓ {len(comments)} comments, one per line")
+        
+        print("\n✓ Exporting comments as columnar file...")
+        filepath = export_comments(posts, 'columnar', filename='test_comments.fbcol')
+        columns = read_columnar(filepath, columns=['comment_text', 'author_id'])
+        assert set(columns) == {'comment_text', 'author_id'}, "Unexpected columns loaded"
+        assert columns['author_id'] == ['user_1', 'user_2', 'user_3'], "Wrong author ids"
+        print("  ✓ Selected columns read back")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_multi_account():
+    """Test the multi-account manifest and combined summary"""
+    print("\n" + "="*70)
+    print("Testing Multi-Account Downloader".center(70))
+    print("="*70)
+    
+    try:
+        from multi_account import load_manifest, summarize_results
+        
+        print("\n✓ Loading account manifest...")
+        manifest_file = 'data/test_manifest.json'
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({'accounts': [
+                {'account_id': 'page_1', 'token': 'token_1'},
+                {'account_id': 'page_2', 'token_file': 'data/page_2_token.json'},
+            ]}, f)
+        accounts = load_manifest(manifest_file)
+        assert [a['account_id'] for a in accounts] == ['page_1', 'page_2'], "Manifest not loaded"
+        print(f"  ✓ {len(accounts)} accounts loaded")
+        
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump([{'account_id': 'page_1'}], f)
+        try:
+            load_manifest(manifest_file)
+            raise AssertionError("Account without token accepted")
+        except ValueError:
+            print("  ✓ Account without token rejected")
+        
+        for account_id in ('../../etc/page', 'page/1', '..', 12345):
+            with open(manifest_file, 'w', encoding='utf-8') as f:
+                json.dump([{'account_id': account_id, 'token': 'token_1'}], f)
+            try:
+                load_manifest(manifest_file)
+                raise AssertionError(f"Account id {account_id!r} accepted")
+            except ValueError:
+                pass
+        print("  ✓ Account ids that could escape data/ rejected")
+        os.remove(manifest_file)
+        
+        print("\n✓ Combining account results...")
+        summary = summarize_results([
+            {'account_id': 'page_1', 'status': 'ok', 'posts': 3, 'comments': 7},
+            {'account_id': 'page_2', 'status': 'failed', 'posts': 0, 'comments': 0},
+        ])
+        assert summary['total_posts'] == 3 and summary['total_comments'] == 7, "Wrong totals"
+        assert summary['succeeded'] == 1 and summary['failed'] == 1, "Wrong status counts"
+        print("  ✓ Summary totals: ✓")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_media_downloader():
+    """Test parallel media download against a local static file server"""
+    print("\n" + "="*70)
+    print("Testing Media Downloader".center(70))
+    print("="*70)
+    
+    try:
+        import shutil
+        import tempfile
+        import threading
+        from functools import partial
+        from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+        from media_downloader import MediaDownloader
+        
+        class QuietHandler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                # Link previews: the image depends on the query string only
+                if self.path.startswith('/safe_image.php'):
+                    body = self.path.split('url=', 1)[1].encode('utf-8') * 1000
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/jpeg')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                super().do_GET()
+            
+            def log_message(self, *args):
+                pass
+        
+        static_dir = tempfile.mkdtemp()
+        media_dir = tempfile.mkdtemp()
+        for name, content in [('a.jpg', b'A' * 200000), ('b.png', b'B' * 1000), ('c.jpg', b'A' * 200000)]:
+            with open(os.path.join(static_dir, name), 'wb') as f:
+                f.write(content)
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), partial(QuietHandler, directory=static_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        
+        posts = [
+            {'id': 'post_1', 'picture': f'{base}/a.jpg?oh=first&oe=1'},
+            {'id': 'post_2', 'picture': f'{base}/c.jpg', 'attachments': {'data': [
+                {'media': {'image': {'src': f'{base}/b.png'}}},
+                {'media': {'image': {'src': f'{base}/missing.jpg'}}},
+            ]}},
+            {'id': 'post_3', 'picture': None},
+        ]
+        
+        print("\n✓ Downloading post media...")
+        stats = MediaDownloader(media_dir=media_dir, workers=4).download_posts(posts)
+        assert stats == {'downloaded': 3, 'skipped': 0, 'failed': 1}, f"Unexpected stats {stats}"
+        assert posts[0]['picture_local'] == posts[1]['picture_local'], "Same content stored twice"
+        assert posts[1]['media_local'][f'{base}/missing.jpg'] is None, "Failed download recorded"
+        assert 'media_local' not in posts[2], "Post without media touched"
+        print(f"  ✓ {stats['downloaded']} files stored by content hash")
+        
+        print("\n✓ Re-running download with re-signed URLs...")
+        posts[0] = {'id': 'post_1', 'picture': f'{base}/a.jpg?oh=second&oe=2'}
+        stats = MediaDownloader(media_dir=media_dir, workers=4).download_posts(posts)
+        assert stats['skipped'] == 3 and stats['downloaded'] == 0, "Stored files downloaded again"
+        assert posts[0]['picture_local'], "Re-signed URL not mapped to stored file"
+        print("  ✓ Existing files skipped")
+        
+        print("\n✓ Keeping images that differ only in the query apart...")
+        previews = [
+            {'id': 'post_4', 'picture': f'{base}/safe_image.php?_nc_cat=1&url=cat'},
+            {'id': 'post_5', 'picture': f'{base}/safe_image.php?_nc_cat=2&url=dog'},
+        ]
+        stats = MediaDownloader(media_dir=media_dir, workers=2).download_posts(previews)
+        assert stats['downloaded'] == 2, f"Preview images collapsed: {stats}"
+        assert previews[0]['picture_local'] != previews[1]['picture_local'], "Different images share a file"
+        print("  ✓ Query parameters other than signatures kept in the index key")
+        
+        if os.path.isdir('/proc/self/fd'):
+            print("\n✓ Checking failed downloads release their files...")
+            downloader = MediaDownloader(media_dir=media_dir, workers=1)
+            open_fds = len(os.listdir('/proc/self/fd'))
+            for i in range(20):
+                try:
+                    downloader.download(f'{base}/missing_{i}.jpg')
+                except Exception:
+                    pass
+            assert len(os.listdir('/proc/self/fd')) <= open_fds + 1, "File descriptors leaked"
+            assert not [n for n in os.listdir(media_dir) if n.endswith('.part')], "Partial files left"
+            print("  ✓ No descriptors or partial files left behind")
+        
+        server.shutdown()
+        shutil.rmtree(static_dir)
+        shutil.rmtree(media_dir)
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_comment_scanner():
+    """Test flagging offensive comments with a lexicon"""
+    print("\n" + "="*70)
+    print("Testing Comment Scanner".center(70))
+    print("="*70)
+    
+    try:
+        from comment_scanner import CommentScanner, load_lexicon
+        
+        print("\n✓ Loading lexicon...")
+        lexicon_file = 'data/test_lexicon.txt'
+        with open(lexicon_file, 'w', encoding='utf-8') as f:
+            f.write("# test lexicon\noffensive\noffensive language\ninappropriate\nre:in+appropriate\n")
+        terms, patterns = load_lexicon(lexicon_file)
+        assert terms == ['offensive', 'offensive language', 'inappropriate'], "Terms not loaded"
+        assert patterns == ['in+appropriate'], "Patterns not loaded"
+        os.remove(lexicon_file)
+        print(f"  ✓ {len(terms)} terms, {len(patterns)} patterns")
+        
+        print("\n✓ Scanning comments...")
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            posts = json.load(f)['posts']
+        flagged = CommentScanner(terms, patterns).scan_posts(posts)
+        assert [c['comment_id'] for c in flagged] == ['comment_1_1', 'comment_2_1'], "Wrong comments flagged"
+        assert flagged[0]['matches'] == ['offensive language'], "Longest term not matched"
+        assert flagged[1]['source_post']['post_id'] == 'post_2', "Source post not linked"
+        print(f"  ✓ {len(flagged)} comments flagged with source post context")
+        
+        assert CommentScanner(['idiot']).match('IDIOTIC idiots') == [], "Partial word matched"
+        assert CommentScanner(['@ss']).match('what an @SS.') == ['@ss'], "Symbol term not matched"
+        assert CommentScanner(['@ss']).match('cl@ss') == [], "Symbol term matched inside a word"
+        print("  ✓ Terms matched as whole words")
+        
+        assert CommentScanner(patterns=['Hate\\s+You']).match('I HATE you') == ['hate you'], "Pattern case-sensitive"
+        with open(lexicon_file, 'w', encoding='utf-8') as f:
+            f.write("idiot\nre:\n")
+        try:
+            load_lexicon(lexicon_file)
+            raise AssertionError("Empty pattern accepted")
+        except ValueError:
+            pass
+        os.remove(lexicon_file)
+        print("  ✓ Patterns match any case, empty patterns rejected")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_comment_analytics():
+    """Test column-backed comment aggregations"""
+    print("\n" + "="*70)
+    print("Testing Comment Analytics".center(70))
+    print("="*70)
+    
+    try:
+        from comment_analytics import CommentTable
+        
+        print("\n✓ Loading export into comment table...")
+        table = CommentTable.from_exports(['data/test_posts.json', 'data/test_posts.json'])
+        assert len(table) == 3, "Overlapping exports not deduplicated"
+        print(f"  ✓ {len(table)} comments loaded")
+        
+        print("\n✓ Running aggregations...")
+        assert table.comments_per_post() == {'post_1': 2, 'post_2': 1}, "Wrong per-post counts"
+        assert table.comments_per_author() == {'user_1': 1, 'user_2': 1, 'user_3': 1}, "Wrong per-author counts"
+        per_hour = table.comments_per_hour()
+        assert per_hour[11] == 2 and per_hour[10] == 1 and sum(per_hour) == 3, "Wrong per-hour counts"
+        assert table.top_commenters(1) == [('user_1', 'Commenter One', 1)], "Wrong top commenter"
+        distribution = table.like_count_distribution()
+        assert distribution['0'] == 1 and distribution['2-4'] == 1 and distribution['5-9'] == 1, "Wrong like distribution"
+        print("  ✓ Per post, author, hour and like count: ✓")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_export_reader():
+    """Test lazy metadata reads, post iteration and indexed lookups"""
+    print("\n" + "="*70)
+    print("Testing Export Reader".center(70))
+    print("="*70)
+    
+    try:
+        from export_reader import ExportReader
+        
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        print("\n✓ Reading export lazily...")
+        with ExportReader('data/test_posts.json') as reader:
+            assert reader.read_metadata() == data['metadata'], "Metadata not read"
+            assert reader.read_user() == data['user'], "User not read"
+            assert list(reader.iter_posts()) == data['posts'], "Posts not iterated"
+            assert len(list(reader.iter_comments())) == 3, "Comments not iterated"
+            print("  ✓ Metadata, user and posts read: ✓")
+            
+            reader.build_index()
+            assert reader.get_post('post_2') == data['posts'][1], "Indexed lookup failed"
+            assert reader.get_post('missing') is None, "Unknown post found"
+            print("  ✓ Post looked up through sidecar index")
+        
+        with ExportReader('data/test_posts.json') as reader:
+            assert reader.get_post('post_1') == data['posts'][0], "Saved index not reused"
+        os.remove('data/test_posts.json.idx')
+        
+        print("\n✓ Reading export with metadata last...")
+        with open('data/test_reversed.json', 'w', encoding='utf-8') as f:
+            json.dump({'posts': data['posts'], 'metadata': data['metadata']}, f)
+        with ExportReader('data/test_reversed.json') as reader:
+            assert reader.read_metadata() == data['metadata'], "Trailing metadata not found"
+        
+        # Nested 'metadata' keys after (or instead of) the top-level one
+        nested_posts = [dict(post, metadata={'source': 'post'}) for post in data['posts']]
+        with open('data/test_reversed.json', 'w', encoding='utf-8') as f:
+            json.dump({'posts': nested_posts, 'metadata': data['metadata'],
+                       'user': {'id': 'test_user', 'metadata': {'source': 'user'}}}, f)
+        with ExportReader('data/test_reversed.json') as reader:
+            assert reader.read_metadata() == data['metadata'], "Nested metadata taken for the top-level one"
+        with open('data/test_reversed.json', 'w', encoding='utf-8') as f:
+            json.dump({'posts': nested_posts}, f)
+        with ExportReader('data/test_reversed.json') as reader:
+            assert reader.read_metadata() == {}, "Post metadata taken for the export's"
+        os.remove('data/test_reversed.json')
+        print("  ✓ Trailing metadata found, nested metadata keys ignored")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_export_merger():
+    """Test deduplicating overlapping exports into one dataset"""
+    print("\n" + "="*70)
+    print("Testing Export Merger".center(70))
+    print("="*70)
+    
+    try:
+        import copy
+        from export_merger import latest_export, merge_exports
+        from main import FacebookDataDownloaderCLI
+        
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            older = json.load(f)
+        older['metadata']['exported_at'] = '2025-12-26T09:00:00'
+        with open('data/test_older.json', 'w', encoding='utf-8') as f:
+            json.dump(older, f)
+        
+        # A later download: one comment edited, one deleted, one new post
+        newer = copy.deepcopy(older)
+        newer['metadata']['exported_at'] = '2025-12-27T09:00:00'
+        newer['posts'][0]['comments'][0]['message'] = 'Great post!'
+        del newer['posts'][0]['comments'][1]
+        newer['posts'].insert(0, {'id': 'post_3', 'message': 'Newest post', 'created_time': '2025-12-27T08:00:00+0000', 'comments': []})
+        with open('data/test_newer.json', 'w', encoding='utf-8') as f:
+            json.dump(newer, f)
+        
+        print("\n✓ Merging overlapping exports...")
+        merged_file, _ = merge_exports(['data/test_newer.json', 'data/test_older.json'])
+        with open(merged_file, 'r', encoding='utf-8') as f:
+            merged = json.load(f)
+        
+        assert merged['metadata']['total_posts'] == 3, "Posts not deduplicated"
+        assert merged['metadata']['total_comments'] == 2, "Comments not deduplicated"
+        assert merged['metadata']['total_deleted_comments'] == 1, "Wrong deleted count"
+        comments = {c['id']: c for p in merged['posts'] for c in p['comments']}
+        assert comments['comment_1_1']['message'] == 'Great post!', "Newest version not kept"
+        assert comments['comment_1_1']['previous_messages'] == ['Great post! This is offensive language here'], "Edit not tracked"
+        assert comments['comment_1_2']['deleted'] is True, "Deletion not tracked"
+        assert merged['metadata']['total_edits'] == 1, "Wrong edit count"
+        print(f"  ✓ {merged['metadata']['total_posts']} posts, {merged['metadata']['total_comments']} comments")
+        print("  ✓ Edits and deletions tracked")
+        os.remove(merged_file)
+        
+        print("\n✓ Merging reply threads...")
+        with_replies = copy.deepcopy(older)
+        with_replies['metadata']['total_replies'] = 2
+        with_replies['posts'][0]['comments'][0]['replies'] = [
+            {'id': 'reply_a', 'message': 'First reply', 'author_id': 'user_9', 'parent_id': 'comment_1_1'},
+            {'id': 'reply_b', 'message': 'Second reply', 'author_id': 'user_8', 'parent_id': 'comment_1_1'},
+        ]
+        later = copy.deepcopy(with_replies)
+        later['metadata']['exported_at'] = '2025-12-27T09:00:00'
+        later['metadata']['total_replies'] = 1
+        later['posts'][0]['comments'][0]['replies'] = [
+            {'id': 'reply_a', 'message': 'First reply, edited', 'author_id': 'user_9', 'parent_id': 'comment_1_1'},
+        ]
+        # Downloaded last, without --replies: says nothing about reply_a
+        plain = copy.deepcopy(older)
+        plain['metadata']['exported_at'] = '2025-12-28T09:00:00'
+        thread_files = {'data/test_replies_1.json': with_replies, 'data/test_replies_2.json': later,
+                        'data/test_replies_3.json': plain}
+        for path, export in thread_files.items():
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(export, f)
+        merged_file, _ = merge_exports(list(thread_files))
+        with open(merged_file, 'r', encoding='utf-8') as f:
+            merged = json.load(f)
+        replies = {r['id']: r for r in merged['posts'][-1]['comments'][0]['replies']}
+        assert replies['reply_a']['previous_messages'] == ['First reply'], "Reply edit not tracked"
+        assert not replies['reply_a'].get('deleted'), "Reply missing from a no-replies export marked deleted"
+        assert replies['reply_b']['deleted'] is True, "Reply deletion not tracked"
+        assert merged['metadata']['total_comments'] == 4, "Replies not counted"
+        assert merged['metadata']['total_replies'] == 1, "Wrong reply count"
+        print(f"  ✓ {merged['metadata']['total_replies']} reply kept, 1 deleted, edits tracked")
+        for path in thread_files:
+            os.remove(path)
+        os.remove(merged_file)
+        
+        print("\n✓ Listing downloads next to the merged file...")
+        os.rename('data/test_older.json', 'data/facebook_data_test_older.json')
+        os.rename('data/test_newer.json', 'data/facebook_data_test_newer.json')
+        # '..._older' sorts after '..._newer' by name
+        latest = latest_export(['data/facebook_data_test_newer.json', 'data/facebook_data_test_older.json'])
+        assert latest == 'data/facebook_data_test_newer.json', "Latest export picked by name"
+        merged_file, _ = merge_exports(['data/facebook_data_test_older.json', 'data/facebook_data_test_newer.json'])
+        json_files = FacebookDataDownloaderCLI()._find_json_files()
+        assert merged_file in json_files, "Merged file not listed"
+        assert 'data/facebook_data_test_older.json' not in json_files, "Merged source counted twice"
+        assert latest_export(json_files) == merged_file, "Merged file not the latest export"
+        print("  ✓ Merged sources left out, latest export picked by exported_at")
+        
+        os.remove('data/facebook_data_test_older.json')
+        os.remove('data/facebook_data_test_newer.json')
+        os.remove(merged_file)
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_models():
+    """Test slotted post/comment records and flat comment views"""
+    print("\n" + "="*70)
+    print("Testing Post/Comment Records".center(70))
+    print("="*70)
+    
+    try:
+        from comment_formats import export_comments, flatten_comments, iter_jsonl
+        from models import Post, iter_flat
+        
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        print("\n✓ Converting posts to records...")
+        posts = [Post.from_dict(post) for post in data['posts']]
+        assert [post.to_dict() for post in posts] == data['posts'], "Round trip changed posts"
+        assert not hasattr(posts[0].comments[0], '__dict__'), "Comment record not slotted"
+        raw = {'id': 'post_9', 'comments': [{'id': 'comment_9_1', 'from': {'name': 'Commenter One', 'id': 'user_1'}}]}
+        assert Post.from_dict(raw).to_dict() == {'id': 'post_9', 'comments': [
+            {'id': 'comment_9_1', 'author': 'Commenter One', 'author_id': 'user_1'}]}, "Absent fields added"
+        print("  ✓ Records round-trip to the export layout")
+        
+        print("\n✓ Flattening records into comment views...")
+        views = list(iter_flat(posts))
+        assert [v.to_dict() for v in views] == list(flatten_comments(data['posts'])), "Views differ from flat export"
+        assert views[2].post is posts[1], "View does not reference its post"
+        print("  ✓ Views match the comments-only layout")
+        
+        filepath = export_comments(posts, 'jsonl', filename='test_records.jsonl')
+        assert len(list(iter_jsonl(filepath))) == 3, "Records not exported"
+        os.remove(filepath)
+        print("  ✓ Records exported directly")
+        
+        print("\n✓ Reading records back from the store...")
+        from comment_scanner import CommentScanner
+        from sqlite_store import SQLiteStore
+        store = SQLiteStore('data/test_records.db')
+        store.sync_file('data/test_posts.json')
+        records = store.get_post_records('data/test_posts.json')
+        store.close()
+        os.remove('data/test_records.db')
+        assert [post.to_dict() for post in records] == data['posts'], "Store records differ from export"
+        flagged = CommentScanner(['offensive']).scan(iter_flat(records))
+        assert [c['comment_id'] for c in flagged] == ['comment_1_1'], "Views not scanned"
+        assert flagged[0]['source_post']['post_id'] == 'post_1', "Flagged view not serialized"
+        print("  ✓ Export and scan paths run on records")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_run_metrics():
+    """Test run timers, counters and report output"""
+    print("\n" + "="*70)
+    print("Testing Run Metrics".center(70))
+    print("="*70)
+    
+    try:
+        from run_metrics import RunMetrics
+        
+        class Fetcher:
+            def _make_request(self, endpoint):
+                if endpoint == 'me':
+                    time.sleep(0.05)
+                return {'data': [{'id': endpoint}]}
+            
+            def get_posts(self, limit=10):
+                return [self._make_request(str(i))['data'][0] for i in range(limit)]
+        
+        metrics = RunMetrics()
+        fetcher = Fetcher()
+        metrics.instrument(fetcher, ['_make_request', 'get_posts', 'missing'], 'fetcher')
+        
+        print("\n✓ Timing instrumented calls...")
+        with metrics.phase('fetch'):
+            posts = fetcher.get_posts(limit=3)
+        assert len(posts) == 3, "Instrumented method changed its result"
+        assert metrics.counters['fetcher._make_request.calls'] == 3, "Inner calls not counted"
+        assert metrics.counters['fetcher.get_posts.calls'] == 1, "Outer call not counted"
+        assert 'fetcher.get_posts.response_json_bytes' not in metrics.counters, "Responses counted twice"
+        assert metrics.counters['fetcher._make_request.response_json_bytes'] > 0, "Response size missing"
+        print("  ✓ Calls counted, including calls made through self")
+        
+        fetcher._make_request('me')
+        report = metrics.report()
+        assert 'fetch' in report['phases'], "Phase missing from report"
+        assert report['latency']['fetcher._make_request']['count'] == 4, "Latency not recorded"
+        assert report['fetch_overhead_seconds'] >= 0, "Requests outside get_posts subtracted"
+        print("  ✓ Report has phases, latencies and fetch overhead")
+        
+        text = metrics.prometheus()
+        assert 'fbdl_fetcher_make_request_calls_total 4' in text, "Prometheus counter missing"
+        assert 'fbdl_fetcher_get_posts_seconds_bucket{le="+Inf"} 1' in text, "Histogram missing"
+        print("  ✓ Prometheus text exposition written")
+        
+        print("\n✓ Counting from worker threads...")
+        import threading
+        
+        class Worker:
+            def _make_request(self, endpoint):
+                if endpoint.endswith('0'):
+                    return {'error': {'message': '(#17) User request limit reached', 'code': 17}}
+                return {'data': []}
+        
+        workers = [Worker() for _ in range(8)]
+        for worker in workers:
+            metrics.instrument(worker, ['_make_request'], 'fetcher')
+        overhead = metrics.report()['fetch_overhead_seconds']
+        threads = [threading.Thread(target=lambda w=w: [w._make_request(str(i)) for i in range(500)]) for w in workers]
+        for thread in threads:
+            thread.start()
+        with metrics.phase('fetch'):
+            fetcher.get_posts(limit=1)
+        for thread in threads:
+            thread.join()
+        assert metrics.counters['fetcher._make_request.calls'] == 4 + 1 + 8 * 500, "Counts lost between threads"
+        assert metrics.histograms['fetcher._make_request'].count == 4 + 1 + 8 * 500, "Latencies lost between threads"
+        assert metrics.counters['fetcher._make_request.throttled'] == 8 * 50, "Throttled responses not counted"
+        assert metrics.report()['fetch_overhead_seconds'] >= overhead, "Worker requests subtracted from get_posts"
+        print(f"  ✓ {metrics.counters['fetcher._make_request.calls']} calls, "
+              f"{metrics.counters['fetcher._make_request.throttled']} throttled")
+        
+        metrics.set_gauge('exit_code', 3)
+        text = metrics.prometheus()
+        assert '# TYPE fbdl_exit_code gauge\nfbdl_exit_code 3' in text, "Exit code not a gauge"
+        assert 'exit_code_total' not in text and metrics.report()['gauges'] == {'exit_code': 3}, "Exit code summed"
+        print("  ✓ Exit code exported as a gauge")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_token_manager():
+    """Test long-lived token exchange, expiry tracking and cached validation"""
+    print("\n" + "="*70)
+    print("Testing Token Manager".center(70))
+    print("="*70)
+    
+    try:
+        from token_manager import TokenManager
+        
+        exchanged = []
+        def exchange(token):
+            exchanged.append(token)
+            return f'long_{len(exchanged)}', 60 * 24 * 3600
+        
+        token_file = 'data/test_token.json'
+        manager = TokenManager(token_file, exchange=exchange)
+        
+        print("\n✓ Exchanging for a long-lived token...")
+        assert manager.resolve('short') == 'long_1', "Token not exchanged"
+        assert 59 * 24 * 3600 < manager.seconds_left() <= 60 * 24 * 3600, "Expiry not tracked"
+        assert TokenManager(token_file, exchange=exchange).resolve('short') == 'long_1', "State not reused"
+        assert len(exchanged) == 1, "Token exchanged again"
+        print("  ✓ Long-lived token stored and reused")
+        
+        print("\n✓ Caching validation...")
+        checks = []
+        user = manager.validate(lambda: checks.append(1) or {'id': '1', 'name': 'Test'})
+        assert user['name'] == 'Test', "Validation failed"
+        manager = TokenManager(token_file, exchange=exchange)
+        manager.resolve('short')
+        assert manager.validate(lambda: checks.append(1)) == user, "Validation not cached"
+        assert len(checks) == 1, "Validation repeated"
+        print("  ✓ Recent validation reused")
+        
+        print("\n✓ Refreshing inside the margin...")
+        manager.state['expires_at'] = manager.expires_at - 55 * 24 * 3600
+        manager.state['exchanged_at'] -= 2 * 3600
+        refreshed = []
+        manager.start_refresh(refreshed.append)
+        for _ in range(50):
+            if refreshed:
+                break
+            time.sleep(0.1)
+        manager.stop()
+        assert refreshed == ['long_2'], "Token not refreshed in background"
+        assert exchanged[-1] == 'long_1', "Refresh did not exchange the long-lived token"
+        print("  ✓ Background refresh swapped the token")
+        
+        print("\n✓ Backing off when an exchange does not extend the token...")
+        short = []
+        def exchange_short(token):
+            short.append(token)
+            return f'short_{len(short)}', 3 * 24 * 3600
+        
+        os.remove(token_file + '.state')
+        manager = TokenManager(token_file, exchange=exchange_short)
+        assert manager.resolve('short') == 'short_1', "Token not exchanged"
+        assert manager.resolve('short') == 'short_1', "Token exchanged again right away"
+        manager.start_refresh()
+        time.sleep(0.3)
+        manager.stop()
+        assert len(short) == 1, f"Refresh loop re-exchanged {len(short)} times"
+        print("  ✓ No repeated exchanges inside the margin")
+        
+        os.remove(token_file + '.state')
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_reply_threads():
+    """Test breadth-first reply expansion and parent links in exports"""
+    print("\n" + "="*70)
+    print("Testing Reply Threads".center(70))
+    print("="*70)
+    
+    try:
+        from comment_formats import export_comments, flatten_comments, read_columnar
+        from models import Post, iter_flat
+        from reply_threads import count_thread, expand_replies
+        
+        with open('data/test_posts.json', 'r', encoding='utf-8') as f:
+            posts = json.load(f)['posts']
+        
+        def reply(reply_id, author_id):
+            return {'id': reply_id, 'message': f'Reply {reply_id}', 'created_time': '2025-12-25T12:00:00+0000',
+                    'author': 'Replier', 'author_id': author_id, 'like_count': 0, 'type': 'comment'}
+        
+        # comment_1_1 has two replies, the first of which has one reply of its own
+        threads = {
+            'comment_1_1': [reply('reply_1', 'user_9'), reply('reply_2', 'user_8')],
+            'reply_1': [reply('reply_3', 'user_1')],
+            'reply_3': [reply('reply_4', 'user_2')],
+        }
+        requested = []
+        def fetch_replies(comment_id):
+            requested.append(comment_id)
+            return [dict(reply) for reply in threads.get(comment_id, [])]
+        
+        print("\n✓ Expanding reply threads...")
+        stats = expand_replies(posts, fetch_replies, max_depth=2, workers=4)
+        assert stats['replies'] == 3 and stats['depth'] == 2, "Wrong reply counts"
+        assert 'reply_3' not in requested, "Depth cap not applied"
+        replies = posts[0]['comments'][0]['replies']
+        assert [r['id'] for r in replies] == ['reply_1', 'reply_2'], "Replies not attached"
+        assert replies[0]['replies'][0]['parent_id'] == 'reply_1', "Parent link missing"
+        assert count_thread(posts) == 6, "Thread count wrong"
+        print(f"  ✓ {stats['replies']} replies in {stats['depth']} levels, {stats['requests']} requests")
+        
+        print("\n✓ Flattening threads for comments-only exports...")
+        flat = list(flatten_comments(posts))
+        assert [c['comment_id'] for c in flat[:4]] == ['comment_1_1', 'reply_1', 'reply_3', 'reply_2'], "Replies not after parent"
+        assert 'parent_id' not in flat[0] and flat[2]['parent_id'] == 'reply_1', "Parent ids wrong"
+        records = [Post.from_dict(post) for post in posts]
+        assert [post.to_dict() for post in records] == posts, "Records lost replies"
+        assert [v.to_dict() for v in iter_flat(records)] == flat, "Record views differ"
+        filepath = export_comments(posts, 'columnar', filename='test_replies.fbcol')
+        columns = read_columnar(filepath, columns=['comment_id', 'parent_id'])
+        assert columns['parent_id'][:3] == [None, 'comment_1_1', 'reply_1'], "Parent column wrong"
+        os.remove(filepath)
+        print("  ✓ Parent links kept in nested and flat layouts")
+        
+        print("\n✓ Exporting raw Graph API threads...")
+        from data_exporter import DataExporter
+        from main import FacebookDataDownloaderCLI
+        from reply_threads import attach_replies
+        
+        raw_posts = [{'id': 'post_9', 'message': 'Raw post', 'created_time': '2025-12-25T10:00:00+0000', 'comments': [
+            {'id': 'raw_1', 'message': 'Top comment', 'created_time': '2025-12-25T11:00:00+0000',
+             'from': {'name': 'Commenter One', 'id': 'user_1'}, 'like_count': 1},
+        ]}]
+        raw_threads = {'raw_1': [{'id': 'raw_2', 'message': 'Raw reply', 'created_time': '2025-12-25T12:00:00+0000',
+                                  'from': {'name': 'Replier', 'id': 'user_9'}, 'like_count': 0}]}
+        expand_replies(raw_posts, lambda comment_id: [dict(r) for r in raw_threads.get(comment_id, [])], workers=2)
+        
+        filepath = DataExporter().export_posts_with_comments(raw_posts, {'id': '123456789'}, filename='test_raw_replies.json')
+        assert attach_replies(filepath, raw_posts) == 1, "Replies not attached to export"
+        with open(filepath, 'r', encoding='utf-8') as f:
+            exported = json.load(f)
+        reply = exported['posts'][0]['comments'][0]['replies'][0]
+        assert reply['parent_id'] == 'raw_1' and reply['author_id'] == 'user_9', "Reply not in export layout"
+        assert 'from' not in reply, "Raw sender left in export"
+        
+        cli = FacebookDataDownloaderCLI()
+        cli.store_file = 'data/test_raw_replies.db'
+        comments_file = cli.export_comments_file(filepath, 'json')
+        cli.store.close()
+        with open(comments_file, 'r', encoding='utf-8') as f:
+            flat = json.load(f)
+        assert [c['comment_id'] for c in flat['comments']] == ['raw_1', 'raw_2'], "Reply missing from comments export"
+        assert flat['comments'][1]['parent_id'] == 'raw_1', "Parent id missing from comments export"
+        assert flat['comments'][1]['author'] == 'Replier', "Reply author lost"
+        assert flat['metadata']['total_comments'] == 2, "Wrong comment count"
+        for path in (filepath, comments_file, 'data/test_raw_replies.db'):
+            os.remove(path)
+        print("  ✓ Replies and parent ids kept in both export files")
+        
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_comment_watcher():
+    """Test watch mode scheduling against a fetcher that produces comments over time"""
+    print("\n" + "="*70)
+    print("Testing Comment Watcher".center(70))
+    print("="*70)
+    
+    try:
+        from datetime import datetime, timezone
+        from comment_formats import iter_jsonl
+        from comment_watcher import CommentWatcher
+        
+        start = datetime(2025, 12, 25, 12, 0, tzinfo=timezone.utc).timestamp()
+        now = [start]
+        
+        def stamp(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+0000')
+        
+        class FakeFetcher:
+            """Hot post: a comment every 15 s; cold post: one every 20 min"""
+            posts = {'hot': (start - 3600, 15), 'cold': (start - 3 * 86400, 1200)}
+            
+            def __init__(self):
+                self.polls = {'hot': 0, 'cold': 0}
+                self.requests = 0
+                self.sent_at = []
+            
+            def _make_request(self, endpoint):
+                self.requests += 1
+                self.sent_at.append(now[0])
+            
+            def get_comments(self, post_id, count=True):
+                if count:
+                    self.polls[post_id] += 1
+                created, every = self.posts[post_id]
+                # Busy threads take two pages
+                for _ in range(1 if every > 60 else 2):
+                    self._make_request(f'{post_id}/comments')
+                return [
+                    {'id': f'{post_id}_{i}', 'message': f'comment {i}', 'author_id': 'user_1',
+                     'created_time': stamp(start - 7200 + i * every)}
+                    for i in range(int((now[0] - start + 7200) // every) + 1)
+                ]
+            
+            def get_posts(self, limit=10):
+                self._make_request('me/posts')
+                return [
+                    {'id': post_id, 'message': post_id, 'created_time': stamp(created),
+                     'comments': self.get_comments(post_id, count=False)}
+                    for post_id, (created, _) in self.posts.items()
+                ][:limit]
+        
+        def sleep(seconds):
+            now[0] += seconds
+        
+        fetcher = FakeFetcher()
+        watcher = CommentWatcher(fetcher, output_dir='data/test_watch', posts_limit=2,
+                                 budget_per_minute=10, hot_interval=60, cold_interval=1800,
+                                 clock=lambda: now[0], sleep=sleep)
+        
+        print("\n✓ Watching for one simulated hour...")
+        stats = watcher.run(duration=3600)
+        assert fetcher.polls['hot'] > 5 * fetcher.polls['cold'] >= 5, "Hot post not polled more often"
+        assert stats['requests'] == fetcher.requests, "Requests not counted"
+        busiest = max(sum(1 for t in fetcher.sent_at if s <= t < s + 60) for s in fetcher.sent_at)
+        assert busiest <= 10, f"Request budget exceeded: {busiest} requests in one minute"
+        print(f"  ✓ {fetcher.polls['hot']} hot polls, {fetcher.polls['cold']} cold polls, "
+              f"{stats['requests']} requests, at most {busiest} in any minute")
+        
+        records = list(iter_jsonl(watcher.writer.path))
+        ids = [r['comment_id'] for r in records]
+        assert len(ids) == len(set(ids)) == stats['new_comments'], "Duplicate comments written"
+        assert 'hot_0' not in ids, "Existing comments written as new"
+        assert len([i for i in ids if i.startswith('hot')]) >= 230, "New hot comments missed"
+        assert records[0]['source_post']['post_id'] in ('hot', 'cold') and records[0]['seen_at'], "Record layout wrong"
+        print(f"  ✓ {len(records)} new comments appended to {watcher.writer.path}")
+        
+        print("\n✓ Watching with a budget smaller than the hot post wants...")
+        tight = FakeFetcher()
+        tight_watcher = CommentWatcher(tight, output_dir='data/test_watch', posts_limit=2,
+                                       budget_per_minute=5, hot_interval=10, cold_interval=1800,
+                                       clock=lambda: now[0], sleep=sleep)
+        tight_watcher.run(duration=600)
+        busiest = max(sum(1 for t in tight.sent_at if s <= t < s + 60) for s in tight.sent_at)
+        assert tight.polls['hot'] >= 5, "Hot post starved"
+        assert busiest <= 5, f"Two-page polls overran the budget: {busiest} requests in one minute"
+        print(f"  ✓ {tight.polls['hot']} hot polls, at most {busiest} requests in any minute")
+        
+        print("\n✓ Charging failed polls...")
+        def fail(endpoint):
+            raise ConnectionError(endpoint)
+        fetcher._make_request = fail
+        watcher.fetcher = fetcher
+        requests_before, errors_before = stats['requests'], stats['errors']
+        watcher.poll(watcher.posts['hot'])
+        assert stats['requests'] == requests_before + 1, "Failed poll not counted"
+        assert stats['errors'] == errors_before + 1, "Failed poll not recorded"
+        print("  ✓ Failed requests counted against the budget")
+        
+        os.remove(watcher.writer.path)
+        os.rmdir('data/test_watch')
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_comment_stage():
+    """Test fetching the comments of many posts at once against the fake Graph API"""
+    print("\n" + "="*70)
+    print("Testing Concurrent Comment Stage".center(70))
+    print("="*70)
+    
+    try:
+        from urllib.parse import urlencode
+        from urllib.request import urlopen
+        from benchmark import FakeGraphAPI
+        from comment_stage import download_posts, limit_requests
+        from comment_watcher import RequestBudget
+        
+        class GraphFetcher:
+            """Sequential fetcher in the shape of FacebookDataFetcher, with its fixed delay"""
+            def __init__(self, base_url):
+                self.base_url = base_url
+            
+            def _make_request(self, url, params=None):
+                if params:
+                    url += '?' + urlencode(params)
+                with urlopen(url) as response:
+                    return json.loads(response.read())
+            
+            def get_comments(self, post_id):
+                comments, url = [], f'{self.base_url}/{post_id}/comments'
+                while url:
+                    page = self._make_request(url)
+                    time.sleep(0.01)
+                    comments.extend(page['data'])
+                    url = page.get('paging', {}).get('next')
+                return comments
+            
+            def get_posts(self, limit=10):
+                posts, url = [], f'{self.base_url}/me/posts'
+                while url and len(posts) < limit:
+                    page = self._make_request(url)
+                    for post in page['data']:
+                        post['comments'] = self.get_comments(post['id'])
+                        posts.append(post)
+                    url = page.get('paging', {}).get('next')
+                return posts[:limit]
+        
+        with FakeGraphAPI(num_posts=24, comments_per_post=30, page_size=25, latency=0.02) as api:
+            print("\n✓ Fetching 24 posts one after another...")
+            start = time.perf_counter()
+            expected = GraphFetcher(api.url).get_posts(limit=24)
+            sequential = time.perf_counter() - start
+            sequential_requests = api.requests
+            
+            print("\n✓ Fetching the same posts with 8 comment workers...")
+            budget = RequestBudget(10000)
+            def make_fetcher():
+                return limit_requests(GraphFetcher(api.url), budget)
+            fetcher = make_fetcher()
+            start = time.perf_counter()
+            posts, stats = download_posts(fetcher, make_fetcher, 24, workers=8)
+            concurrent = time.perf_counter() - start
+        
+        assert posts == expected, "Posts or comments differ from get_posts"
+        assert stats == {'posts': 24, 'comments': 720, 'failed': 0}, "Wrong stats"
+        assert 'get_comments' not in fetcher.__dict__, "get_comments left replaced"
+        assert api.requests - sequential_requests == sequential_requests, "Requests repeated or skipped"
+        assert len(budget.sent) == sequential_requests, "Requests not charged to the shared budget"
+        assert sequential / concurrent > 2, f"Only {sequential / concurrent:.1f}x faster"
+        print(f"  ✓ {sequential:.2f}s sequential, {concurrent:.2f}s concurrent "
+              f"({sequential / concurrent:.1f}x), {len(budget.sent)} requests through the budget")
+        
+        print("\n✓ Waiting for a full budget...")
+        now = [0.0]
+        def sleep(seconds):
+            now[0] += seconds
+        budget = RequestBudget(2, clock=lambda: now[0])
+        for _ in range(5):
+            budget.acquire(sleep)
+        assert now[0] == 120, "Budget not enforced across requests"
+        print("  ✓ 5 requests at 2 per minute took 2 minutes")
+        
+        print("\n✓ Downloading more posts than one page holds...")
+        from main import FacebookDataDownloaderCLI
+        exported = []
+        def export_posts_with_comments(posts, user_info):
+            exported.extend(posts)
+            return 'data/facebook_data_test.json'
+        with FakeGraphAPI(num_posts=150, comments_per_post=1, page_size=100) as api:
+            cli = FacebookDataDownloaderCLI()
+            cli.fetcher = GraphFetcher(api.url)
+            cli.exporter.export_posts_with_comments = export_posts_with_comments
+            cli.download(120, {'id': 'test_user'})
+        assert len(exported) == 120, f"{len(exported)} posts downloaded instead of 120"
+        print(f"  ✓ {len(exported)} posts over 2 pages")
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_throttle_backoff():
+    """Test retrying rate-limited requests against the fake Graph API"""
+    print("\n" + "="*70)
+    print("Testing Throttle Backoff".center(70))
+    print("="*70)
+    
+    try:
+        from urllib.error import HTTPError
+        from urllib.request import urlopen
+        from benchmark import FakeGraphAPI
+        from throttle_backoff import ThrottleBackoff, throttle_code
+        
+        class GraphFetcher:
+            """Returns error bodies instead of raising, like requests' response.json()"""
+            def __init__(self, base_url):
+                self.base_url = base_url
+            
+            def _make_request(self, url):
+                try:
+                    with urlopen(url) as response:
+                        return json.loads(response.read())
+                except HTTPError as e:
+                    return json.loads(e.read())
+            
+            def get_comments(self, post_id):
+                comments, url = [], f'{self.base_url}/{post_id}/comments'
+                while url:
+                    page = self._make_request(url)
+                    if 'error' in page:
+                        raise RuntimeError(page['error']['message'])
+                    comments.extend(page['data'])
+                    url = page.get('paging', {}).get('next')
+                return comments
+        
+        waits = []
+        backoff = ThrottleBackoff(retries=3, base_delay=1.0, max_delay=3.0, sleep=waits.append, random=lambda: 0.5)
+        
+        print("\n✓ Fetching comments while every 3rd request is rate limited...")
+        with FakeGraphAPI(num_posts=5, comments_per_post=60, page_size=25, throttle_every=3) as api:
+            fetcher = backoff.wrap(GraphFetcher(api.url))
+            comments = [fetcher.get_comments(f'post_{i}') for i in range(5)]
+            
+            assert [len(c) for c in comments] == [60] * 5, "Comments lost to throttling"
+            assert backoff.stats['throttled'] == api.throttled > 0, "Throttled responses not counted"
+            assert backoff.stats['retries'] == api.throttled and not backoff.stats['gave_up'], "Throttled requests not retried"
+            assert waits == [0.5] * api.throttled, "First retry not after a jittered delay"
+            print(f"  ✓ {api.throttled} throttled requests retried, all {sum(map(len, comments))} comments fetched")
+            
+            print("\n✓ Backing off further on repeated throttling...")
+            api.throttle_every = 1
+            waits.clear()
+            response = fetcher._make_request(f'{api.url}/post_0/comments')
+            assert throttle_code(response) == 4, "Error not returned after the last retry"
+            assert waits == [0.5, 1.0, 1.5], "Delay not doubled and capped"
+            assert backoff.stats['gave_up'] == 1, "Gave-up request not counted"
+            print(f"  ✓ Waited {waits} before giving up")
+        
+        assert throttle_code({'error': {'code': 613}}) == 613 and throttle_code({'error': {'code': 100}}) is None, "Wrong codes"
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
+def test_response_cache():
+    """Test caching Graph API responses by endpoint and params"""
+    print("\n" + "="*70)
+    print("Testing Response Cache".center(70))
+    print("="*70)
+    
+    try:
+        from response_cache import ResponseCache
+        
+        now = [1000.0]
+        
+        class FakeFetcher:
+            def __init__(self):
+                self.calls = []
+            
+            def _make_request(self, endpoint, params=None):
+                self.calls.append((endpoint, params))
+                if endpoint.endswith('broken'):
+                    return {'error': {'message': 'Unsupported get request', 'code': 100}}
+                return {'data': [{'id': f'{endpoint}_{len(self.calls)}'}]}
+        
+        db_path = 'data/test_cache.db'
+        cache = ResponseCache(db_path, clock=lambda: now[0])
+        fetcher = cache.wrap(FakeFetcher(), scope='token_a')
+        
+        print("\n✓ Repeating requests...")
+        first = fetcher._make_request('https://graph.facebook.com/v18.0/post_1/comments', {'limit': 100})
+        first['data'].append('changed by caller')
+        again = fetcher._make_request('post_1/comments?limit=100&access_token=secret')
+        assert len(fetcher.calls) == 1 and len(again['data']) == 1, "Repeated request not cached"
+        fetcher._make_request('post_1/comments', {'limit': 25})
+        fetcher._make_request('broken')
+        fetcher._make_request('broken')
+        assert len(fetcher.calls) == 4, "Different params or errors served from cache"
+        assert cache.stats['hits'] == 1 and cache.stats['misses'] == 4, "Wrong hit/miss stats"
+        print(f"  ✓ {cache.summary()['hit_rate']:.0%} hit rate, errors not cached")
+        
+        print("\n✓ Expiring by endpoint TTL...")
+        fetcher._make_request('me')
+        now[0] += 601
+        fetcher._make_request('me')
+        fetcher._make_request('post_1/comments', {'limit': 100})
+        assert len(fetcher.calls) == 6, "TTLs not applied per endpoint"
+        print("  ✓ User info kept, comments refetched")
+        
+        print("\n✓ Reading back from disk...")
+        cache.close()
+        cache = ResponseCache(db_path, max_bytes=60, clock=lambda: now[0])
+        fetcher = cache.wrap(FakeFetcher(), scope='token_a')
+        fetcher._make_request('me')
+        assert fetcher.calls == [] and cache.stats['hits'] == 1, "Disk store not used"
+        other = cache.wrap(FakeFetcher(), scope='token_b')
+        other._make_request('me')
+        assert len(other.calls) == 1, "Responses shared between tokens"
+        print("  ✓ Stored responses survive restarts, scoped per token")
+        
+        for i in range(3):
+            fetcher._make_request(f'post_{i}')
+        assert cache.memory_bytes <= 60 and cache.stats['evicted'] >= 2, "Memory LRU not bounded"
+        assert list(cache.memory)[-1].endswith('post_2'), "Newest entry evicted"
+        print(f"  ✓ {cache.stats['evicted']} entries evicted from memory")
+        
+        cache.close()
+        os.remove(db_path)
+        return True
+        
+    except Exception as e:
+        print(f"  ✗ Test failed: {e}")
+        return False
+
+
 def test_imports():
     """Test that all modules can be imported correctly"""
     print("\n" + "="*70)
@@ -219,6 +1354,13 @@ def test_cli_startup():
             compile(content, 'main.py', 'exec')
         print("  ✓ main.py syntax valid")
         
+        # Check headless subcommands parse
+        from main import build_parser
+        args = build_parser().parse_args(['export-comments', '--format', 'jsonl', '--json'])
+        assert args.command == 'export-comments', "Subcommand not parsed"
+        assert args.format == 'jsonl' and args.json, "Subcommand options not parsed"
+        print("  ✓ Headless subcommands parsed")
+        
         return True
         
     except Exception as e:
@@ -276,6 +1418,22 @@ def main():
         ("Module Imports", test_imports),
         ("CLI Module", test_cli_startup),
         ("Data Exporter", test_data_exporter),
+        ("SQLite Store", test_sqlite_store),
+        ("Comment Formats", test_comment_formats),
+        ("Multi-Account", test_multi_account),
+        ("Media Downloader", test_media_downloader),
+        ("Comment Scanner", test_comment_scanner),
+        ("Comment Analytics", test_comment_analytics),
+        ("Export Reader", test_export_reader),
+        ("Export Merger", test_export_merger),
+        ("Post/Comment Records", test_models),
+        ("Run Metrics", test_run_metrics),
+        ("Token Manager", test_token_manager),
+        ("Reply Threads", test_reply_threads),
+        ("Comment Watcher", test_comment_watcher),
+        ("Response Cache", test_response_cache),
+        ("Concurrent Comment Stage", test_comment_stage),
+        ("Throttle Backoff", test_throttle_backoff),
     ]
     
     results = []